@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Benchmarks loading, reshuffling and reporting on synthetic data with the same columns as car.csv, model.csv and trips.csv
+#
+#   python benchmark.py                                  # 10k, 100k and 1M reservations, results written to benchmark.json
+#   python benchmark.py --sizes 10000 100000 --engine first_fit
+#   python benchmark.py --compare benchmark.json --output new.json    # run again and compare against an earlier baseline
+#
+# Every size runs in a fresh process, so the peak memory of one run does not hide the next one
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import exam
+
+
+#######################
+# Synthetic generator #
+#######################
+
+# Creates a fleet with the columns of car.csv, using the models and categories of model.csv and car_category.csv
+# Inputs: the number of cars, the share of cars per number of seats ({seats: share}), the number of locations and a random seed
+# Returns car_raw, model_raw and car_category_raw dataframes
+def generate_fleet(number_of_cars=300, seat_mix=None, number_of_locations=60, seed=0):
+    rng = np.random.default_rng(seed)
+
+    model_raw        = pd.read_csv("data/model.csv", sep=";")
+    car_category_raw = pd.read_csv("data/car_category.csv", sep=";")
+
+    # by default, use the same share of each number of seats as the models in model.csv
+    if seat_mix is None:
+        seat_mix = model_raw['seats'].value_counts(normalize=True).to_dict()
+
+    seats  = np.array(list(seat_mix))
+    shares = np.array(list(seat_mix.values()), dtype=float)
+    car_seats = rng.choice(seats, size=number_of_cars, p=shares / shares.sum())
+
+    # pick a random model with the right number of seats for every car
+    model_ids = np.empty(number_of_cars, dtype=np.int64)
+    for x in seats:
+        cars_with_x_seats = car_seats == x
+        model_ids[cars_with_x_seats] = rng.choice(model_raw.loc[model_raw['seats'] == x, 'model_id'].to_numpy(), size=cars_with_x_seats.sum())
+
+    car_raw = pd.DataFrame({
+        "car_id":      np.arange(1, number_of_cars + 1),
+        "model_id":    model_ids,
+        "location_id": rng.integers(1, number_of_locations + 1, number_of_cars).astype(float),
+        "car_number":  np.arange(1, number_of_cars + 1) + 300,
+        "icon_url":    "/car-icons/synthetic.png",
+    })
+
+    return car_raw, model_raw, car_category_raw
+
+
+# Creates trips with the columns of trips.csv for the cars of car_raw
+# Bookings arrive as a Poisson process and their durations follow a gamma distribution, rounded to whole minutes
+# Inputs: the number of trips, the cars, the arrivals per hour, the mean and shape of the durations in hours, the first day and a random seed
+def generate_trips(number_of_trips, car_raw, arrivals_per_hour=30, mean_duration_hours=3, duration_shape=2, start="2023-01-01", seed=0):
+    rng = np.random.default_rng(seed)
+
+    first_start = pd.Timestamp(start, tz="UTC").value // 10**9
+    starts      = first_start + np.cumsum(rng.exponential(3600 / arrivals_per_hour, number_of_trips)).astype(np.int64) // 60 * 60
+    durations   = np.maximum(rng.gamma(duration_shape, mean_duration_hours / duration_shape, number_of_trips) * 3600 // 60 * 60, 60).astype(np.int64)
+
+    return pd.DataFrame({
+        "trip_id":   np.arange(number_of_trips),
+        "driven_km": rng.integers(0, 300, number_of_trips),
+        "start_ts":  pd.to_datetime(starts, unit="s", utc=True),
+        "ends_ts":   pd.to_datetime(starts + durations, unit="s", utc=True),
+        "car_id":    rng.choice(car_raw['car_id'].to_numpy(), number_of_trips),
+    })
+
+
+##############
+# Benchmarks #
+##############
+
+# Peak resident memory of this process in megabytes (ru_maxrss is in kilobytes on Linux and in bytes on macOS)
+def peak_memory_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+# Generates the data for one size and times loading, reshuffling and reporting. Runs in its own process
+# Inputs: the number of reservations, the reshuffle engine, the intended pause between each booking and the generator options
+# Returns a dictionary with the timings, peak memory, cars used and leftover bookings
+def run_case(number_of_trips, engine="sweep", minutes_pause=30, number_of_cars=300, arrivals_per_hour=30, mean_duration_hours=3, seed=0, overlap_checks=10_000):
+    car_raw, model_raw, car_category_raw = generate_fleet(number_of_cars, seed=seed)
+    trips_raw = generate_trips(number_of_trips, car_raw, arrivals_per_hour, mean_duration_hours, seed=seed)
+    result = {"reservations": number_of_trips, "engine": engine, "cars": number_of_cars}
+
+    # load
+    start_time = time.perf_counter()
+    car_table = exam.build_car_table(car_raw, model_raw, car_category_raw)
+    fleet     = exam.load_fleet(car_table)
+    schedule  = exam.Schedule(trips_raw['start_ts'].min(), trips_raw['ends_ts'].max(), fleet=fleet)
+    for reservation in exam.load_reservations(trips_raw, car_table):
+        schedule.add_reservation(reservation)
+    result["load_s"] = time.perf_counter() - start_time
+
+    # reshuffle
+    start_time = time.perf_counter()
+    schedule.reshuffle(minutes_pause=minutes_pause, engine=engine)
+    result["reshuffle_s"] = time.perf_counter() - start_time
+
+    # overlap checks against the reshuffled schedule, for random bookings and cars with the same number of seats
+    rng = np.random.default_rng(seed)
+    reservations = [reservation for sublist in schedule.trips.values() for reservation in sublist]
+    sample = [reservations[i] for i in rng.integers(0, len(reservations), overlap_checks)]
+    cars = [rng.choice(fleet.get_cars_by_seats(reservation.seats)) for reservation in sample]
+    start_time = time.perf_counter()
+    for reservation, car in zip(sample, cars):
+        schedule.can_accommodate_reservation(reservation, car, minutes_pause=minutes_pause)
+    result["overlap_check_us"] = (time.perf_counter() - start_time) / overlap_checks * 10**6
+
+    # report
+    start_time = time.perf_counter()
+    schedule.report(specified_schedule="trips")
+    schedule.report(specified_schedule="reshuffled_trips")
+    result["report_s"] = time.perf_counter() - start_time
+
+    result["cars_used_before"] = len(schedule.trips)
+    result["cars_used_after"]  = len(schedule.reshuffled_trips)
+    result["leftover_trips"]   = len(schedule.leftover_trips)
+    result["peak_memory_mb"]   = peak_memory_mb()
+
+    return result
+
+
+# Runs every size in a fresh process. Inputs: the sizes and the options of run_case. Returns a list of results
+def run_benchmarks(sizes, **options):
+    results = []
+    for number_of_trips in sizes:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            result = executor.submit(run_case, number_of_trips, **options).result()
+        print(json.dumps(result), flush=True)
+        results.append(result)
+
+    return results
+
+
+# Compares results with a baseline. A timing or the peak memory counts as a regression when it is more than tolerance
+# (as a fraction) above the baseline. Inputs: the new results, the baseline results and the tolerance. Returns a list of messages
+def compare_with_baseline(results, baseline, tolerance=0.2):
+    regressions = []
+    baseline_by_case = {(b["reservations"], b["engine"]): b for b in baseline}
+
+    for result in results:
+        before = baseline_by_case.get((result["reservations"], result["engine"]))
+        if before is None:
+            continue
+        for key in ("load_s", "reshuffle_s", "report_s", "overlap_check_us", "peak_memory_mb"):
+            if result[key] > before[key] * (1 + tolerance):
+                regressions.append(f"{result['reservations']} reservations, {result['engine']}: {key} {before[key]:.3f} -> {result[key]:.3f}")
+        for key in ("cars_used_after", "leftover_trips"):
+            if result[key] > before[key]:
+                regressions.append(f"{result['reservations']} reservations, {result['engine']}: {key} {before[key]} -> {result[key]}")
+
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark loading, reshuffling and reporting on synthetic data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="numbers of reservations")
+    parser.add_argument("--engine", default="sweep", choices=["first_fit", "sweep", "optimal"])
+    parser.add_argument("--minutes-pause", type=int, default=30)
+    parser.add_argument("--cars", type=int, default=300, help="fleet size")
+    parser.add_argument("--arrivals-per-hour", type=float, default=30)
+    parser.add_argument("--mean-duration-hours", type=float, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark.json", help="file to write the results to")
+    parser.add_argument("--compare", help="baseline file to compare the results with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown before a result counts as a regression")
+    args = parser.parse_args()
+
+    # read the baseline before the run, so it can not be overwritten by the results it is compared with
+    if args.compare:
+        if os.path.abspath(args.compare) == os.path.abspath(args.output):
+            parser.error("--output would overwrite the --compare baseline, write the results to another file")
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+
+    results = run_benchmarks(args.sizes, engine=args.engine, minutes_pause=args.minutes_pause, number_of_cars=args.cars,
+                             arrivals_per_hour=args.arrivals_per_hour, mean_duration_hours=args.mean_duration_hours, seed=args.seed)
+
+    with open(args.output, "w") as file:
+        json.dump({"python": platform.python_version(), "machine": platform.machine(), "results": results}, file, indent=2)
+
+    if args.compare:
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        for message in regressions:
+            print("REGRESSION:", message)
+        sys.exit(1 if regressions else 0)
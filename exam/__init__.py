@@ -0,0 +1,67 @@
+# Car sharing reservations scheduling problem: reshuffles the bookings of a car sharing fleet onto as few cars as possible
+#
+#   from exam import Dataset
+#   schedule = Dataset("data").schedule()
+#   schedule.reshuffle(minutes_pause=30)
+#   schedule.report(specified_schedule="reshuffled_trips")
+#
+# The names below are imported from their modules the first time they are used, so importing the package is fast and
+# pandas and matplotlib are only imported by the parts that need them. The command line interface is in __main__.py
+
+import importlib
+
+# {name: module it is defined in}
+EXPORTS = {
+    "Car":                            "fleet",
+    "Fleet":                          "fleet",
+    "location_of":                    "fleet",
+    "to_epoch_seconds":               "reservations",
+    "Reservation":                    "reservations",
+    "ReservationTable":               "reservations",
+    "IntervalIndex":                  "intervals",
+    "FenwickTree":                    "intervals",
+    "MaxSegmentTree":                 "intervals",
+    "OccupancyTimeline":              "intervals",
+    "RESHUFFLE_ORDERS":               "engines",
+    "sweep_assign":                   "engines",
+    "max_overlapping":                "engines",
+    "max_served_bookings":            "engines",
+    "split_rolling_windows":          "engines",
+    "batch_chains":                   "engines",
+    "calculate_fleet_metrics":        "metrics",
+    "calculateImprovementStatistics": "metrics",
+    "Instrumentation":                "instrumentation",
+    "Schedule":                       "schedule",
+    "reshuffle_group":                "schedule",
+    "reshuffle_window":               "schedule",
+    "reshuffle_chains":               "schedule",
+    "Dataset":                        "loading",
+    "build_car_table":                "loading",
+    "load_fleet":                     "loading",
+    "load_reservation_table":         "loading",
+    "load_reservations":              "loading",
+    "stream_trip_windows":            "loading",
+    "flush_trip_windows":             "loading",
+    "reshuffle_trip_stream":          "analysis",
+    "measure_reservation_memory":     "analysis",
+    "benchmark_online_insertion":     "analysis",
+    "run_scenario":                   "analysis",
+    "run_scenarios":                  "analysis",
+    "render_gantt":                   "gantt",
+    "render_schedule_async":          "gantt",
+}
+
+__all__ = list(EXPORTS)
+
+
+def __getattr__(name):
+    if name not in EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(f".{EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(EXPORTS))
@@ -0,0 +1,129 @@
+# The command line interface
+#
+#   python -m exam                                   # reads data/, reshuffles and prints the reports
+#   python -m exam run --gantt gantt.png             # also draws the Gantt chart
+#   python -m exam run --minutes-pause 15 --engine sweep --save snapshot
+#   python -m exam run --rolling-hours 24 --overlap-hours 4    # a rolling horizon, one day at a time
+#   python -m exam report snapshot                   # the reports of a schedule saved with --save, without reading the CSVs
+
+import argparse
+import sys
+
+
+# Prints the reports before and after reshuffling and the improvement statistics
+def print_reports(schedule):
+    from .metrics import calculateImprovementStatistics
+
+    # generate report based on the schdule before reshuffling
+    report_before_reshuffling = schedule.report(specified_schedule="trips")
+    number_of_utilized_cars_before = len(report_before_reshuffling)
+
+    # generate report based on the schdule after reshuffling
+    report_after_reshuffling = schedule.report(specified_schedule="reshuffled_trips")
+    number_of_utilized_cars_after = len(report_after_reshuffling)
+
+    # calculate improvement statistics
+    utilization_before = report_before_reshuffling["Utilization"].to_numpy() / 100
+    utilization_after  = report_after_reshuffling["Utilization"].to_numpy() / 100
+
+    std_deviation_change = calculateImprovementStatistics(utilization_before, utilization_after)
+
+    # presentation
+    print("=============================")
+    print("STATISTICS BEFORE RESHUFFLING")
+    print("=============================")
+    print(report_before_reshuffling)
+
+    print("============================")
+    print("STATISTICS AFTER RESHUFFLING")
+    print("============================")
+    print(report_after_reshuffling)
+
+    print("======================")
+    print("IMPROVEMENT STATISTICS")
+    print("======================")
+
+    print(f"Number of leftover bookings:    {schedule.count_leftover_trips()}")
+    print(f"Reduction of utilized cars:     {number_of_utilized_cars_before - number_of_utilized_cars_after} cars")
+    print(f"Reduction of utilized cars:     {(number_of_utilized_cars_before/number_of_utilized_cars_after - 1)*100:.1f}%")
+    print(f"Increase in fleet utilizatin standard deviation: {std_deviation_change:.1f}x")
+
+
+# Reads the data, reshuffles, prints the reports and draws the Gantt chart
+def run(args):
+    from .loading import Dataset
+
+    #####################################################################
+    # Read data, initialize the fleet, schedule and reservation objects #
+    #####################################################################
+    schedule = Dataset(args.data).schedule()
+
+    #########################################
+    # Reshufling and performance evaluation #
+    #########################################
+    print("reshuffling...")
+    if args.rolling_hours:
+        schedule.reshuffle_rolling(window_hours=args.rolling_hours, overlap_hours=args.overlap_hours, minutes_pause=args.minutes_pause,
+                                   engine=args.engine, workers=args.workers)
+    else:
+        schedule.reshuffle(minutes_pause=args.minutes_pause, engine=args.engine, workers=args.workers)
+
+    # draw the schedules before and after reshuffling in a separate process while the reports are calculated. The process pool
+    # is shut down after the chart is drawn, since a pool that is still shutting down when python exits can fail at exit
+    if args.gantt:
+        from concurrent.futures import ProcessPoolExecutor
+        from .gantt import render_schedule_async
+        gantt_executor = ProcessPoolExecutor(max_workers=1)
+        gantt_chart    = render_schedule_async(schedule, args.gantt, executor=gantt_executor)
+
+    print_reports(schedule)
+
+    if args.save:
+        schedule.save(args.save)
+        print(f"Schedule saved to {args.save}")
+
+    if args.gantt:
+        gantt_chart.result()
+        gantt_executor.shutdown()
+        print(f"Gantt chart written to {args.gantt}")
+
+
+# Prints the reports of a saved schedule
+def report(args):
+    from .schedule import Schedule
+
+    print_reports(Schedule.load(args.snapshot))
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # run is the default command
+    if not argv or argv[0].startswith("-") and argv[0] not in ("-h", "--help"):
+        argv = ["run", *argv]
+
+    parser = argparse.ArgumentParser(prog="python -m exam", description="Reshuffle car sharing reservations onto fewer cars")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="read the data, reshuffle and print the reports (the default)")
+    run_parser.add_argument("--data", default="data", help="directory with car.csv, model.csv, car_category.csv and trips.csv")
+    run_parser.add_argument("--minutes-pause", type=int, default=30, help="pause between two bookings of a car")
+    run_parser.add_argument("--engine", default="first_fit", choices=["first_fit", "sweep", "optimal"])
+    run_parser.add_argument("--workers", type=int, help="processes to reshuffle the seat groups in (a rolling horizon also splits a group where none of its cars is busy)")
+    run_parser.add_argument("--rolling-hours", type=float, help="reshuffle one window of this many hours at a time (first_fit or sweep engine)")
+    run_parser.add_argument("--overlap-hours", type=float, default=0, help="hours after each rolling window that are planned with it")
+    run_parser.add_argument("--gantt", help="image file to draw the Gantt chart in (not drawn by default)")
+    run_parser.add_argument("--save", help="directory to save the schedule to, for the report command")
+    run_parser.set_defaults(handler=run)
+
+    report_parser = commands.add_parser("report", help="print the reports of a saved schedule")
+    report_parser.add_argument("snapshot", help="directory written by run --save")
+    report_parser.set_defaults(handler=report)
+
+    args = parser.parse_args(argv)
+    if args.command == "run" and args.rolling_hours and args.engine == "optimal":
+        run_parser.error("--rolling-hours works with the first_fit and sweep engines, not optimal")
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# Analyses on top of the schedule: streaming a large trips file, memory and latency measurements, and what-if scenarios
+
+import gc
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .loading import load_fleet, stream_trip_windows
+from .reservations import ReservationTable
+from .schedule import reshuffle_window
+
+
+# Reshuffles a trips file one time window at a time, as the rolling horizon of Schedule.reshuffle_rolling, and calculates the metrics
+# of each window as soon as it is complete. The cars that are still busy when a window ends are kept busy in the next one, and the
+# bookings of the overlap_hours after a window are planned with it. Only the current window and the next one (for the overlap) are
+# kept in memory, so the memory use does not grow with the size of the file
+# Inputs: the trips file, the merged car table, the window and overlap lengths, the intended pause between each booking, the reshuffle
+# engine (first_fit or sweep), and the chunk size and allowed disorder of stream_trip_windows
+# Returns a dataframe with one row of statistics per window
+def reshuffle_trip_stream(path, car_table, window_hours=24, overlap_hours=0, minutes_pause=0, engine="first_fit", chunksize=100_000, max_lateness_hours=24):
+    if overlap_hours > window_hours:
+        raise ValueError("the overlap can not be longer than a window, since only the next window is read ahead")
+    fleet  = load_fleet(car_table)
+    length = int(window_hours * 3600)
+    carry  = {} # {car_id: end of the car's last booking}, for the cars that are still busy when the next window starts
+    
+    rows    = []
+    windows = stream_trip_windows(path, car_table, window_hours, chunksize, max_lateness_hours)
+    current = next(windows, None)
+    while current is not None:
+        window_start, table = current
+        following  = next(windows, None)
+        window_end = int(window_start.timestamp()) + length
+        
+        # the bookings of the next window that start in the overlap
+        if following is None:
+            lookahead = []
+        else:
+            lookahead = following[1].take(np.flatnonzero(following[1].start < window_end + overlap_hours * 3600)).to_reservations()
+            
+        carried = len(carry)
+        # the window's own schedule, which is dropped once its statistics are recorded
+        schedule, car_ids, carry = reshuffle_window(table.to_reservations(), lookahead, fleet, carry, window_end, minutes_pause, engine)
+        report_before = schedule.report(specified_schedule="trips")
+        report_after  = schedule.report(specified_schedule="reshuffled_trips")
+        
+        rows.append({
+            "Window start":             window_start,
+            "Number of reservations":   len(table),
+            "Cars busy at the start":   carried,
+            "Cars used before":         len(report_before),
+            "Cars used after":          len(report_after),
+            "Leftover bookings":        len(schedule.leftover_trips),
+            "Mean utilization before":  report_before["Utilization"].mean(),
+            "Mean utilization after":   report_after["Utilization"].mean(),
+        })
+        current = following
+        
+    return pd.DataFrame(rows).set_index("Window start")
+
+
+# Measures the memory of n reservations stored as Reservation objects and as a ReservationTable.
+# Returns megabytes per million reservations for both. Input: the number of synthetic reservations to create
+def measure_reservation_memory(n=1_000_000):
+    import tracemalloc
+
+    rng    = np.random.default_rng(0)
+    starts = 1_672_531_200 + np.sort(rng.integers(0, 365*24*3600, n))
+    table  = ReservationTable(np.arange(n), rng.integers(0, 300, n), starts, starts + rng.integers(900, 8*3600, n),
+                              rng.integers(0, 700, n), np.full(n, 5), np.full(n, 3), {3: "Småbil"})
+
+    tracemalloc.start()
+    reservations = table.to_reservations()
+    object_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del reservations
+
+    return {
+        "Reservation objects": object_bytes / n * 1_000_000 / 2**20,
+        "ReservationTable":    table.nbytes  / n * 1_000_000 / 2**20,
+    }
+
+
+# Streams bookings into a schedule one at a time with insert_reservation and records the latency of every call and the number of
+# cars in use after it. Inputs: the schedule (usually already reshuffled), the new bookings in arrival order, and the options
+# of insert_reservation. Returns a dataframe with one row per booking
+def benchmark_online_insertion(schedule, reservations, minutes_pause=0, max_moves=2):
+    rows = []
+    for reservation in reservations:
+        start_time = time.perf_counter()
+        car_id = schedule.insert_reservation(reservation, minutes_pause=minutes_pause, max_moves=max_moves)
+        latency = time.perf_counter() - start_time
+        
+        rows.append((reservation.trip_id, car_id, latency * 1000, len(schedule.reshuffled_trips), len(schedule.leftover_trips)))
+        
+    return pd.DataFrame(rows, columns=["Trip ID", "Car ID", "Latency (ms)", "Cars used", "Leftover bookings"])
+
+
+# the schedule the scenario workers reshuffle. It is set before the process pool forks, so the workers share its memory
+scenario_schedule = None
+
+
+# Reshuffles scenario_schedule with one scenario's settings and returns a row of the comparison table of run_scenarios
+def run_scenario(minutes_pause, fleet_caps, sort_by, engine):
+    start_time = time.perf_counter()
+    scenario_schedule.reshuffle(minutes_pause=minutes_pause, engine=engine, sort_by=sort_by, fleet_caps=fleet_caps)
+    report = scenario_schedule.report(specified_schedule="reshuffled_trips")
+    
+    return {
+        "Minutes pause":     minutes_pause,
+        "Fleet caps":        fleet_caps,
+        "Sort by":           sort_by,
+        "Cars used":         len(scenario_schedule.reshuffled_trips),
+        "Leftover bookings": len(scenario_schedule.leftover_trips),
+        "Mean utilization":  report["Utilization"].mean(),
+        "Std utilization":   report["Utilization"].std(ddof=0),
+        "Runtime (s)":       time.perf_counter() - start_time,
+    }
+
+
+# Runs reshuffle and the metrics for every combination of pause, fleet caps and booking order, to choose a pause or see whether
+# the fleet can shrink. The scenarios run in a process pool started with fork, so the workers share the loaded schedule and fleet
+# without copying or pickling them (gc.freeze keeps the garbage collector from touching, and so copying, the shared pages).
+# The workers' reshuffles do not change the schedule of this process. Where fork is not available, the scenarios run one after
+# the other in this process, and the schedule keeps the reshuffle of the last scenario
+# Inputs: the schedule, the pauses in minutes, the fleet caps ({seats: number of cars}, or None for the whole fleet),
+# the booking orders (see RESHUFFLE_ORDERS), the engine and the number of processes
+# Returns a dataframe with one row per scenario. Utilization is in percent, over the cars used
+def run_scenarios(schedule, minutes_pauses=(30,), fleet_caps=(None,), sort_strategies=("duration",), engine="first_fit", workers=None):
+    global scenario_schedule
+    scenarios = [(minutes_pause, caps, sort_by) for minutes_pause in minutes_pauses for caps in fleet_caps for sort_by in sort_strategies]
+    
+    scenario_schedule = schedule
+    
+    try:
+        if "fork" in multiprocessing.get_all_start_methods():
+            gc.freeze()
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as executor:
+                rows = list(executor.map(run_scenario, *zip(*scenarios), [engine] * len(scenarios)))
+        else:
+            rows = [run_scenario(*scenario, engine) for scenario in scenarios]
+    finally:
+        gc.unfreeze()
+        scenario_schedule = None
+        
+    return pd.DataFrame(rows)
@@ -0,0 +1,148 @@
+# The building blocks of the reshuffle engines that do not need a schedule
+
+import heapq
+from bisect import bisect_left
+
+import numpy as np
+
+
+# The orders reshuffle can place the bookings of a group in: {name: (key, reverse)}. The sweep engine always goes by start time
+RESHUFFLE_ORDERS = {
+    "duration": (lambda reservation: reservation.end - reservation.start, True),  # longest first
+    "shortest": (lambda reservation: reservation.end - reservation.start, False), # shortest first
+    "start":    (lambda reservation: reservation.start, False),                   # earliest first
+}
+
+
+
+# Gives each booking the free car with the lowest rank, going through the bookings in the given order (sorted by start).
+# A min-heap of car ranks holds the free cars and a min-heap of (free from, rank) holds the busy cars, so each booking costs O(log C)
+# Inputs: the bookings sorted by start, the number of cars, the pause in seconds and the cars that are busy before the first
+# booking ({rank: time the car is free again}, see Schedule.reshuffle_rolling)
+# Returns the rank of the car of each booking, or None if no car is free
+def sweep_assign(reservations, number_of_cars, pause=0, busy_until=None):
+    busy_until = busy_until or {}
+    free_cars  = [rank for rank in range(number_of_cars) if rank not in busy_until] # ranks of the free cars. A sorted list is already a heap
+    busy_cars  = [(free_from, rank) for rank, free_from in busy_until.items()]     # (time the car is free again, rank)
+    ranks      = []
+    heapq.heapify(busy_cars)
+    
+    for booking in reservations:
+        # release the cars that are free again when this booking starts
+        while busy_cars and busy_cars[0][0] <= booking.start:
+            heapq.heappush(free_cars, heapq.heappop(busy_cars)[1])
+            
+        if not free_cars:
+            ranks.append(None)
+            continue
+        
+        rank = heapq.heappop(free_cars)
+        heapq.heappush(busy_cars, (booking.end + pause, rank))
+        ranks.append(rank)
+        
+    return ranks
+
+
+# Returns the largest number of bookings in progress at the same time, counting the pause after each booking.
+# No plan can use fewer cars than this. Inputs: the start and end times as numpy arrays and the pause in seconds
+def max_overlapping(starts, ends, pause=0):
+    if len(starts) == 0:
+        return 0
+    
+    times  = np.concatenate([starts, ends + pause])
+    deltas = np.concatenate([np.ones(len(starts), dtype=np.int64), -np.ones(len(ends), dtype=np.int64)])
+    # a car that is free again at a start time can take that booking, so ends are counted before starts
+    order  = np.lexsort((deltas, times))
+    
+    return int(np.cumsum(deltas[order]).max())
+
+
+# Chooses the largest set of bookings that fits on the given number of cars, as a min-cost flow over the time line:
+# the points in time are nodes, every car is one unit of flow from the first to the last point, a car can wait from one point
+# to the next, and a booking is an edge from its start to its end plus the pause with cost -1. The constraint matrix is totally
+# unimodular, so the linear program has an integral optimum. Many choices often serve the same number of bookings, and the solver
+# could return any of them, so each booking also gets a tiny extra cost that prefers the earlier bookings. Those extra costs add
+# up to less than one booking, so they only break ties. Needs scipy
+# Inputs: the start and end times as numpy arrays (sorted by start, for the ties to prefer earlier bookings), the number of cars,
+# the pause in seconds and the time limit of the solver in seconds
+# Returns a boolean array of the chosen bookings (None if the solver did not finish) and the solver's message
+def max_served_bookings(starts, ends, number_of_cars, pause=0, time_limit=10):
+    from scipy.optimize import linprog
+    from scipy.sparse import coo_matrix
+    
+    points = np.unique(np.concatenate([starts, ends + pause]))
+    if len(points) < 2 or number_of_cars == 0:
+        return np.full(len(starts), number_of_cars > 0), "trivial"
+    
+    # edges: waiting edges from point i to i+1 first, then one edge per booking
+    tails = np.concatenate([np.arange(len(points) - 1), np.searchsorted(points, starts)])
+    heads = np.concatenate([np.arange(1, len(points)), np.searchsorted(points, ends + pause)])
+    edges = np.arange(len(tails))
+    
+    # flow conservation: flow in - flow out = number_of_cars at the last point, -number_of_cars at the first point, 0 elsewhere
+    A_eq = coo_matrix((np.concatenate([np.ones(len(edges)), -np.ones(len(edges))]), (np.concatenate([heads, tails]), np.concatenate([edges, edges]))),
+                      shape=(len(points), len(edges))).tocsr()
+    b_eq = np.zeros(len(points))
+    b_eq[0]  = -number_of_cars
+    b_eq[-1] = number_of_cars
+    
+    # booking i costs -1 - (n - i) / 2n², which sums to less than 1/2 over all bookings
+    n      = len(starts)
+    cost   = np.concatenate([np.zeros(len(points) - 1), -1 - np.arange(n, 0, -1) / (2 * n * n)])
+    bounds = np.concatenate([np.tile([0, number_of_cars], (len(points) - 1, 1)), np.tile([0, 1], (len(starts), 1))])
+    
+    # the dual simplex method returns a vertex of the polytope, which is integral here
+    result = linprog(cost, A_eq=A_eq, b_eq=b_eq, bounds=bounds, method="highs-ds", options={"time_limit": time_limit})
+    if result.status != 0:
+        return None, result.message
+    
+    return result.x[len(points) - 1:] > 0.5, result.message
+
+
+
+# Splits bookings sorted by start time into the windows of a rolling horizon. Window n covers [n*window_hours, (n+1)*window_hours)
+# hours after the epoch, so the windows start at midnight UTC when window_hours divides 24, and windows without bookings are skipped.
+# Each window also gets the bookings that start in the overlap_hours after it, to plan them without keeping them.
+# A window depends on the windows before it through the cars that are still busy when it starts. Where every earlier booking is
+# over by the start of a window (including the pause), the window does not depend on them and starts a new chain of windows
+# Returns the chains, each a list of windows as (start, end, bookings of the window, bookings of the overlap), in seconds since the epoch
+def split_rolling_windows(reservations, window_hours, overlap_hours=0, minutes_pause=0):
+    pause   = minutes_pause * 60
+    length  = int(window_hours * 3600)
+    overlap = int(overlap_hours * 3600)
+    starts  = [booking.start for booking in reservations]
+    
+    chains     = []
+    latest_end = None # the time every booking before the current window is over, including the pause
+    i          = 0
+    
+    while i < len(reservations):
+        window_start = starts[i] // length * length
+        window_end   = window_start + length
+        j = bisect_left(starts, window_end, i)
+        k = bisect_left(starts, window_end + overlap, j)
+        
+        if latest_end is None or latest_end <= window_start:
+            chains.append([])
+        chains[-1].append((window_start, window_end, reservations[i:j], reservations[j:k]))
+        
+        window_latest_end = max(booking.end for booking in reservations[i:j]) + pause
+        latest_end = window_latest_end if latest_end is None else max(latest_end, window_latest_end)
+        i = j
+        
+    return chains
+
+
+# Splits chains of windows of split_rolling_windows into at most parts batches of consecutive chains with about the same number of
+# bookings each, to hand one batch to each worker process. Returns the batches, each a list of chains
+def batch_chains(chains, parts=1):
+    sizes = [sum(len(window[2]) for window in windows) for windows in chains]
+    total = sum(sizes)
+    
+    batches = {} # {batch number: [chain]}
+    done    = 0  # the bookings of the chains before the current one
+    for windows, size in zip(chains, sizes):
+        batches.setdefault(done * parts // total, []).append(windows)
+        done += size
+        
+    return list(batches.values())
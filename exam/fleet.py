@@ -0,0 +1,144 @@
+# Cars and the fleet they belong to
+
+import numpy as np
+
+
+# A car object holds information about the car and has a method to list it's reservations
+# The model is looked up in model_raw and car_category_raw if they are given. The bulk loader sets it with set_model instead
+class Car:
+    def __init__(self, car_id, model_id, location_id, car_number, icon_url, model_raw=None, car_category_raw=None):
+        self.car_id      = car_id # with car_id, each object can be linked to car.csv
+        self.model_id    = model_id
+        self.location_id = location_id
+        self.car_number  = car_number
+        self.icon_url    = icon_url
+        
+        if model_raw is None:
+            return
+        
+        # get information about the car model from the model dataframe
+        model_row = model_raw[model_raw['model_id'] == model_id]
+        
+        # some models are missing in model.csv
+        if not model_row.empty:
+            category_id = model_row['category_id'].iloc[0]
+            # get information about the car's category from the categoty dataframe
+            category_row = car_category_raw[car_category_raw['category_id'] == category_id]
+
+            self.set_model(model_row['model_name'].iloc[0], model_row['seats'].iloc[0], category_id, category_row['category_name'].iloc[0])
+            
+    # stores information about the car's model. Cars with a model missing in model.csv never get these attributes
+    def set_model(self, model_name, seats, category_id, category_name):
+        self.model_name    = model_name
+        self.seats         = seats
+        self.category_id   = category_id
+        self.category_name = category_name
+            
+            
+    
+    # lists the car's reservations. Inputs: the schedule object and a specification to use the schedule beofre or after reshuffling 
+    def list_reservations(self, schedule, specified_schedule="trips"):
+        car_id = self.car_id
+        
+        # get bookings from the original schedule if this is specified
+        if specified_schedule=="trips":
+            # if the car has andy bookings
+            if car_id in schedule.trips:
+                bookings = schedule.trips[car_id]
+            # else, the car is not booked
+            else:
+                bookings = []
+                
+        # get bookings from the reshuffled schedule if this is specified  
+        elif specified_schedule=="reshuffled_trips":
+            # if the car has andy bookings
+            if car_id in schedule.reshuffled_trips:
+                bookings = schedule.reshuffled_trips[car_id]
+            # else, the car is not booked
+            else:
+                bookings = []
+            
+        # print information about each booking
+        for b in bookings:
+            print("Reservation ID", b.trip_id, "Start:", b.start_ts, "End", b.ends_ts)
+            
+        return bookings
+    
+
+    
+# A fleet object holds car objects and has the ability to create a subset of cars with the same number of seats
+# The subsets are built once and cached. add_car clears the cache, and invalidate_index has to be called after changing cars in place
+class Fleet:
+    def __init__(self):
+        self.cars = {}
+        self.invalidate_index()
+
+    def add_car(self, id, car):
+        self.cars[id] = car
+        self.invalidate_index()
+        
+    # clears the cached subsets of cars
+    def invalidate_index(self):
+        self.index    = {} # {(attribute, sort_by): {value: [car]}}
+        self.id_index = {} # {(attribute, sort_by): {value: numpy array of car ids}}
+        
+    # groups all cars by the value of an attribute, each group sorted by the sort_by property in the order the cars were added
+    # A tuple of attributes groups by the tuple of their values
+    # Cars without the attribute (e.g. cars whose model is missing in model.csv) or with a missing value are left out
+    def build_index(self, attribute, sort_by=None):
+        attributes = attribute if isinstance(attribute, tuple) else (attribute,)
+        
+        groups = {} # {value: [car]}
+        for car_id, car in self.cars.items():
+            values = tuple(getattr(car, name, None) for name in attributes)
+            if any(value is None or value != value for value in values): # value != value is True for NaN
+                continue
+            groups.setdefault(values if isinstance(attribute, tuple) else values[0], []).append(car)
+            
+        if sort_by is not None:
+            for cars in groups.values():
+                cars.sort(key=lambda car: getattr(car, sort_by))
+                
+        return groups
+        
+    # returns the cars where the attribute has the given value, sorted by sort_by. The list is shared with the cache and must not be changed
+    # Inputs: the attribute (e.g. "seats", "category_id", "location_id"), its value and the property to sort the subset on
+    def get_cars_by(self, attribute, value, sort_by=None):
+        key = (attribute, sort_by)
+        if key not in self.index:
+            self.index[key] = self.build_index(attribute, sort_by)
+            
+        return self.index[key].get(value, [])
+    
+    # returns the ids of the cars where the attribute has the given value as a numpy array, in the same order as get_cars_by
+    def get_car_ids_by(self, attribute, value, sort_by=None):
+        key = (attribute, sort_by)
+        if key not in self.id_index:
+            self.id_index[key] = {}
+            
+        ids = self.id_index[key]
+        if value not in ids:
+            ids[value] = np.array([car.car_id for car in self.get_cars_by(attribute, value, sort_by)], dtype=np.int64)
+            
+        return ids[value]
+        
+    # returns a subset of cars with the same nubmer of seats. Input: x=number of seats, sort_by=proerty to sort the subset on
+    def get_cars_by_seats(self, x, sort_by=None):
+        return self.get_cars_by("seats", x, sort_by)
+    
+    # returns the ids of the cars with x seats as a numpy array. Input: x=number of seats, sort_by=proerty to sort the subset on
+    def get_car_ids_by_seats(self, x, sort_by=None):
+        return self.get_car_ids_by("seats", x, sort_by)
+    
+    # returns the cars with x seats at a location. location_id=None gives the cars with x seats whose location is unknown
+    def get_cars_by_seats_and_location(self, x, location_id, sort_by=None):
+        if location_id is None:
+            return [car for car in self.get_cars_by_seats(x, sort_by) if location_of(car) is None]
+        return self.get_cars_by(("seats", "location_id"), (x, location_id), sort_by)
+        
+
+
+# Returns the location of a car, or None if it is unknown (location_id is NaN for some cars in car.csv)
+def location_of(car):
+    location_id = getattr(car, "location_id", None)
+    return None if location_id is None or location_id != location_id else location_id
@@ -0,0 +1,134 @@
+# Gantt charts of the schedule before and after reshuffling, one row per car and one bar per booking
+#
+#   python -m exam.gantt snapshot result.png                        # a schedule saved with Schedule.save
+#   python -m exam.gantt snapshot week.png --start 2023-03-06 --end 2023-03-13
+#
+# All bars of a schedule are drawn as one PolyCollection, built with numpy instead of one broken_barh call per car.
+# Only the bookings in the visible window are drawn, and bookings of the same car that are closer together than a pixel are
+# merged into one bar, so the number of polygons is limited by the size of the image and not by the number of bookings.
+# Rendering uses the Agg canvas directly (not pyplot), so it can run in a worker thread or process while the pipeline goes on
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
+import matplotlib.dates as mdates
+
+from .reservations import ReservationTable, to_epoch_seconds
+
+
+# Returns the bars of a schedule as (row, start, end) arrays with times in seconds since epoch, cut to the window and merged
+# where the gap between two bookings of a car is shorter than resolution seconds
+# Inputs: the ReservationTable of the schedule, the sorted car ids (car_ids[row]), the window and the resolution in seconds
+def gantt_bars(table, car_ids, start, end, resolution):
+    # only the bookings that are visible in the window, cut to it
+    visible = (table.end > start) & (table.start < end)
+    car_id  = table.car_id[visible]
+    left    = np.maximum(table.start[visible], start)
+    right   = np.minimum(table.end[visible], end)
+
+    # sort by car, then by start time
+    order  = np.lexsort((left, car_id))
+    car_id, left, right = car_id[order], left[order], right[order]
+    if len(car_id) == 0:
+        return np.empty(0, dtype=np.int64), left, right
+
+    # the latest end so far within each car, as bookings can overlap in the original schedule. Shifting each car's ends
+    # by more than the window keeps the running maximum from reaching into the next car
+    new_car    = np.r_[True, car_id[1:] != car_id[:-1]]
+    shift      = (np.cumsum(new_car) - 1) * (end - start + 1)
+    latest_end = np.maximum.accumulate(right + shift) - shift
+    
+    # a new bar starts at the first booking of a car and wherever the gap to the bookings before it is visible
+    new_bar     = new_car.copy()
+    new_bar[1:] |= left[1:] > latest_end[:-1] + resolution
+
+    # merge the bookings of each bar
+    first = np.flatnonzero(new_bar)
+    last  = np.r_[first[1:], len(car_id)] - 1
+    row   = np.searchsorted(car_ids, car_id[first])
+
+    return row, left[first], latest_end[last]
+
+
+# Draws one schedule into an axes as a single PolyCollection. Inputs: the axes, the bars from gantt_bars, the title and the color
+def draw_bars(ax, row, left, right, title, color):
+    # rectangles as (n, 4, 2) arrays of corners, with times in days since epoch as matplotlib dates use them
+    x0, x1 = left / 86400, right / 86400
+    y0, y1 = row - 0.4, row + 0.4
+    corners = np.stack([np.stack([x0, y0], axis=1), np.stack([x0, y1], axis=1),
+                        np.stack([x1, y1], axis=1), np.stack([x1, y0], axis=1)], axis=1)
+
+    ax.add_collection(PolyCollection(corners, facecolors=color, edgecolors="none"))
+    ax.set_title(title)
+    ax.set_ylabel("car")
+
+
+# Renders Gantt charts of the schedules to an image file, one panel per schedule with the same car rows
+# Inputs: a dictionary {title: ReservationTable}, the file name, the visible window (the whole period if None), the size in inches and dpi
+# Returns the number of bars drawn per schedule
+def render_gantt(tables, path, start_ts=None, ends_ts=None, size=(16, 10), dpi=100):
+    start = to_epoch_seconds(start_ts) if start_ts is not None else min(int(table.start.min()) for table in tables.values() if len(table))
+    end   = to_epoch_seconds(ends_ts) if ends_ts is not None else max(int(table.end.max()) for table in tables.values() if len(table))
+
+    # one row per car of any of the schedules, by car id
+    car_ids = np.unique(np.concatenate([table.car_id for table in tables.values()]))
+
+    # bookings closer together than one pixel cannot be told apart
+    resolution = (end - start) / (size[0] * dpi)
+
+    figure = Figure(figsize=size, dpi=dpi)
+    FigureCanvasAgg(figure)
+    axes = figure.subplots(len(tables), 1, sharex=True, sharey=True, squeeze=False)[:, 0]
+
+    bars = {}
+    for ax, (title, table), color in zip(axes, tables.items(), ["tab:blue", "tab:orange", "tab:green", "tab:red"]):
+        row, left, right = gantt_bars(table, car_ids, start, end, resolution)
+        draw_bars(ax, row, left, right, title, color)
+        bars[title] = len(row)
+
+    axes[-1].set_xlim(start / 86400, end / 86400)
+    axes[-1].set_ylim(-1, len(car_ids))
+    locator = mdates.AutoDateLocator()
+    axes[-1].xaxis.set_major_locator(locator)
+    axes[-1].xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+
+    figure.tight_layout()
+    figure.savefig(path)
+    return bars
+
+
+# Renders the schedule before and after reshuffling in a separate process, so the caller can go on while the image is drawn.
+# The schedules are passed as ReservationTables, which only hold numpy arrays and are cheap to send to the process
+# Inputs: the schedule, the file name, the visible window, and an executor (a new one-process pool if None). Returns a Future
+def render_schedule_async(schedule, path, start_ts=None, ends_ts=None, executor=None, **options):
+    tables = {"before reshuffling": schedule.to_table("trips"), "after reshuffling": schedule.to_table("reshuffled_trips")}
+
+    if executor is None:
+        executor = ProcessPoolExecutor(max_workers=1)
+        future = executor.submit(render_gantt, tables, path, start_ts, ends_ts, **options)
+        executor.shutdown(wait=False)
+        return future
+
+    return executor.submit(render_gantt, tables, path, start_ts, ends_ts, **options)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Draw Gantt charts of a schedule saved with Schedule.save, before and after reshuffling")
+    parser.add_argument("snapshot", help="directory written by Schedule.save")
+    parser.add_argument("output", help="image file, e.g. result.png")
+    parser.add_argument("--start", help="start of the visible window (default: the whole period)")
+    parser.add_argument("--end", help="end of the visible window")
+    parser.add_argument("--width", type=float, default=16, help="width in inches")
+    parser.add_argument("--height", type=float, default=10, help="height in inches")
+    parser.add_argument("--dpi", type=int, default=100)
+    args = parser.parse_args()
+
+    # the tables are memory-mapped, so only the columns that are drawn are read
+    tables = {"before reshuffling": ReservationTable.load(f"{args.snapshot}/trips"),
+              "after reshuffling":  ReservationTable.load(f"{args.snapshot}/reshuffled_trips")}
+    bars = render_gantt(tables, args.output, args.start, args.end, size=(args.width, args.height), dpi=args.dpi)
+    print(f"wrote {args.output}: " + ", ".join(f"{count} bars {title}" for title, count in bars.items()))
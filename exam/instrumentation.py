@@ -0,0 +1,131 @@
+# Counters, timings and optional profiles of a schedule
+
+import cProfile
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+
+# Counters and per-phase timings of a schedule, to see where the time goes. Off by default: the hot paths only check
+# self.enabled, and phase() returns a context manager that does nothing
+#   schedule.instrumentation.enable(profile=True, trace_memory=True)
+#   schedule.reshuffle(minutes_pause=30)
+#   schedule.instrumentation.as_dict(), schedule.instrumentation.prometheus_text(), schedule.instrumentation.profiles["reshuffle"]
+class Instrumentation:
+    # counters recorded by the schedule
+    COUNTERS = {
+        "reservations_added": "bookings added to the original schedule",
+        "bookings_placed":    "bookings placed in the reshuffled schedule",
+        "overlap_checks":     "calls to can_accommodate_reservation",
+        "cars_probed":        "cars considered by the reshuffle engines, one per placed booking for the sweep and optimal engines",
+        "leftover_bookings":  "bookings left over after reshuffling",
+    }
+    
+    def __init__(self):
+        self.enabled      = False
+        self.profile      = False # run cProfile around the phases that are captured
+        self.trace_memory = False # run tracemalloc around the phases that are captured
+        self.reset()
+        
+    # Clears everything recorded so far
+    def reset(self):
+        self.counters     = dict.fromkeys(self.COUNTERS, 0)
+        self.timings      = {} # {phase: [seconds, calls]}
+        self.profiles     = {} # {phase: pstats.Stats}
+        self.memory_peaks = {} # {phase: peak traced memory in bytes}
+        self.snapshots    = {} # {phase: tracemalloc.Snapshot}
+        
+    # Starts recording. profile and trace_memory also capture cProfile statistics and tracemalloc snapshots of reshuffle
+    def enable(self, profile=False, trace_memory=False):
+        self.enabled      = True
+        self.profile      = profile
+        self.trace_memory = trace_memory
+        
+    def disable(self):
+        self.enabled = False
+        
+    # Adds n to a counter. Callers on hot paths check self.enabled first, to skip the call
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+            
+    # Adds the counters recorded by another process (see reshuffle_group)
+    def merge(self, counters):
+        for name, n in counters.items():
+            self.counters[name] = self.counters.get(name, 0) + n
+            
+    # Returns a context manager that times a phase. With capture=True, the phase is also profiled and its memory traced
+    # if that is enabled. Phases can be nested, and a phase that runs several times adds up
+    def phase(self, name, capture=False):
+        if not self.enabled:
+            return nullcontext()
+        return self.timed_phase(name, capture)
+    
+    @contextmanager
+    def timed_phase(self, name, capture):
+        profiler = cProfile.Profile() if capture and self.profile else None
+        tracing  = capture and self.trace_memory
+        started_tracing = tracing and not tracemalloc.is_tracing()
+        
+        if started_tracing:
+            tracemalloc.start()
+        if tracing:
+            tracemalloc.reset_peak()
+        if profiler is not None:
+            profiler.enable()
+        start_time = time.perf_counter()
+        
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start_time
+            if profiler is not None:
+                profiler.disable()
+                self.profiles[name] = pstats.Stats(profiler)
+            if tracing:
+                self.memory_peaks[name] = tracemalloc.get_traced_memory()[1]
+                self.snapshots[name]    = tracemalloc.take_snapshot()
+            if started_tracing:
+                tracemalloc.stop()
+                
+            timing = self.timings.setdefault(name, [0.0, 0])
+            timing[0] += elapsed
+            timing[1] += 1
+            
+    # Returns the counters, the timings and the memory peaks as a dictionary
+    def as_dict(self):
+        counters = dict(self.counters)
+        # the average number of cars an engine looks at before a booking is placed or left over
+        bookings = counters["bookings_placed"] + counters["leftover_bookings"]
+        counters["cars_probed_per_booking"] = counters["cars_probed"] / bookings if bookings else 0.0
+        
+        return {
+            "counters":          counters,
+            "timings":           {name: {"seconds": seconds, "calls": calls} for name, (seconds, calls) in self.timings.items()},
+            "peak_memory_bytes": dict(self.memory_peaks),
+        }
+    
+    # Returns the counters, the timings and the memory peaks in the Prometheus text format. Inputs: the prefix of the metric names
+    def prometheus_text(self, prefix="schedule"):
+        lines = []
+        for name, n in self.counters.items():
+            lines.append(f"# HELP {prefix}_{name}_total {self.COUNTERS.get(name, name)}")
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {n}")
+            
+        if self.timings:
+            lines.append(f"# HELP {prefix}_phase_seconds time spent in each phase")
+            lines.append(f"# TYPE {prefix}_phase_seconds summary")
+            for name, (seconds, calls) in self.timings.items():
+                lines.append(f'{prefix}_phase_seconds_sum{{phase="{name}"}} {seconds:.6f}')
+                lines.append(f'{prefix}_phase_seconds_count{{phase="{name}"}} {calls}')
+                
+        if self.memory_peaks:
+            lines.append(f"# HELP {prefix}_phase_peak_memory_bytes peak memory traced by tracemalloc in each phase")
+            lines.append(f"# TYPE {prefix}_phase_peak_memory_bytes gauge")
+            for name, peak in self.memory_peaks.items():
+                lines.append(f'{prefix}_phase_peak_memory_bytes{{phase="{name}"}} {peak}')
+                
+        return "\n".join(lines) + "\n"
+    
@@ -0,0 +1,236 @@
+# Sorted and bucketed indexes over booking times: the overlap check of one car and the occupancy timeline of the whole fleet
+
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from .reservations import to_epoch_seconds
+
+
+# An interval index holds the bookings of one car as start and end times sorted by start.
+# Bookings that were accepted by the overlap check never contain each other, so the ends are sorted as well.
+# This turns the overlap check into two binary searches instead of a scan over all bookings
+class IntervalIndex:
+    def __init__(self):
+        self.starts = [] # start times in seconds since epoch, sorted
+        self.ends   = [] # end times in seconds since epoch, in the same order as starts
+        self.items  = [] # the reservation behind each interval, in the same order as starts
+
+    def __len__(self):
+        return len(self.starts)
+
+    # inserts an interval while keeping the lists sorted. Input: start and end in seconds since epoch and the reservation it belongs to
+    def insert(self, start, end, item=None):
+        i = bisect_right(self.starts, start)
+        # a booking with zero duration can share its start with a longer booking. Keep the shorter one first
+        while i > 0 and self.starts[i-1] == start and self.ends[i-1] > end:
+            i -= 1
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.items.insert(i, item)
+
+    # removes the interval of a reservation. Input: start and end in seconds since epoch and the reservation
+    def remove(self, start, end, item):
+        i = bisect_left(self.starts, start)
+        while self.items[i] is not item:
+            i += 1
+        del self.starts[i]
+        del self.ends[i]
+        del self.items[i]
+
+    # returns True if the interval overlaps any stored interval. Uses the same rules as the original linear scan:
+    # bookings that only touch do not overlap, but a booking that lies completely inside the interval does
+    def overlaps(self, start, end):
+        # the last booking that starts before the interval ends has the latest end of those bookings
+        k = bisect_left(self.starts, end)
+        if k > 0 and self.ends[k-1] > start:
+            return True
+
+        # the first booking that starts inside the interval has the earliest end of those bookings
+        i = bisect_left(self.starts, start)
+        if i < len(self.starts) and self.ends[i] <= end:
+            return True
+
+        return False
+
+    # returns the reservations whose intervals overlap the interval, by the same rules as overlaps
+    def conflicts(self, start, end):
+        # the overlapping bookings lie between the first one that ends at or after start and the last one that starts at or before end
+        first = bisect_left(self.ends, start)
+        last  = bisect_right(self.starts, end)
+
+        return [self.items[j] for j in range(first, last)
+                if (start < self.ends[j]) and (end > self.starts[j]) or (start <= self.starts[j]) and (end >= self.ends[j])]
+
+
+
+# A Fenwick tree (binary indexed tree) over n buckets that adds a value to a range of buckets and sums a range of buckets,
+# both in O(log n). It keeps two trees over the differences between neighbouring buckets
+class FenwickTree:
+    def __init__(self, n):
+        self.n  = n
+        self.b1 = [0] * (n + 1) # differences
+        self.b2 = [0] * (n + 1) # differences times their bucket number
+        
+    def update(self, tree, i, value):
+        i += 1
+        while i <= self.n:
+            tree[i] += value
+            i += i & -i
+            
+    def prefix(self, tree, i):
+        total = 0
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+    
+    # adds value to every bucket in [first, last)
+    def add(self, first, last, value):
+        self.update(self.b1, first, value)
+        self.update(self.b1, last, -value)
+        self.update(self.b2, first, value * first)
+        self.update(self.b2, last, -value * last)
+        
+    # returns the sum of the buckets in [first, last)
+    def sum(self, first, last):
+        return (self.prefix(self.b1, last) * last - self.prefix(self.b2, last)) - (self.prefix(self.b1, first) * first - self.prefix(self.b2, first))
+
+
+
+# A segment tree over n buckets that adds a value to a range of buckets and finds the largest bucket in a range, both in O(log n).
+# Node p covers the buckets of its children 2p and 2p+1, and the leaves are the nodes n..2n-1. The value added to all of a node's
+# buckets is kept in pending[p] instead of being passed down, and is only pushed to the children when a query goes through the node
+class MaxSegmentTree:
+    def __init__(self, n):
+        self.n       = n
+        self.height  = n.bit_length()
+        self.largest = [0] * (2 * n) # the largest bucket below each node
+        self.pending = [0] * n       # the value added to every bucket below each inner node
+        
+    def apply(self, p, value):
+        self.largest[p] += value
+        if p < self.n:
+            self.pending[p] += value
+            
+    # recomputes the ancestors of node p after a change below them
+    def rebuild(self, p):
+        while p > 1:
+            p >>= 1
+            self.largest[p] = max(self.largest[2*p], self.largest[2*p+1]) + self.pending[p]
+            
+    # passes the pending values of the ancestors of node p down to their children, from the root down
+    def push(self, p):
+        for level in range(self.height, 0, -1):
+            i = p >> level
+            if self.pending[i]:
+                self.apply(2*i, self.pending[i])
+                self.apply(2*i+1, self.pending[i])
+                self.pending[i] = 0
+                
+    # adds value to every bucket in [first, last)
+    def add(self, first, last, value):
+        left, right = first + self.n, last + self.n
+        while left < right:
+            if left & 1:
+                self.apply(left, value)
+                left += 1
+            if right & 1:
+                right -= 1
+                self.apply(right, value)
+            left >>= 1
+            right >>= 1
+        self.rebuild(first + self.n)
+        self.rebuild(last - 1 + self.n)
+        
+    # returns the largest bucket in [first, last)
+    def max(self, first, last):
+        left, right = first + self.n, last + self.n
+        self.push(left)
+        self.push(right - 1)
+        
+        largest = -np.inf
+        while left < right:
+            if left & 1:
+                largest = max(largest, self.largest[left])
+                left += 1
+            if right & 1:
+                right -= 1
+                largest = max(largest, self.largest[right])
+            left >>= 1
+            right >>= 1
+        return largest
+
+
+
+# An occupancy timeline counts the booked cars of each number of seats in fixed time buckets (15 minutes by default), and answers
+# availability and utilization questions for any time window in O(log n) instead of scanning every car's bookings.
+# Bookings are added and removed one at a time, so it can follow the reshuffled schedule as bookings are placed.
+# A booking (and the pause after it) counts as busy in every bucket it touches. The period is fixed when the timeline is created,
+# and the parts of bookings outside it are left out
+class OccupancyTimeline:
+    def __init__(self, start, end, cars, bucket_minutes=15, minutes_pause=0):
+        self.bucket = bucket_minutes * 60
+        self.pause  = minutes_pause * 60
+        self.origin = to_epoch_seconds(start) // self.bucket * self.bucket
+        self.size   = max(1, -(-(to_epoch_seconds(end) + self.pause - self.origin) // self.bucket))
+        self.cars   = dict(cars) # {seats: number of cars}
+        self.clear()
+        
+    # removes all bookings
+    def clear(self):
+        self.busy_cars    = {} # {seats: MaxSegmentTree of the number of busy cars in each bucket}
+        self.busy_seconds = {} # {seats: FenwickTree of the booked car-seconds in each bucket}
+        
+    # the buckets [first, last) that overlap the time [start, end) in seconds since epoch, inside the period
+    def buckets(self, start, end):
+        first = min(max((start - self.origin) // self.bucket, 0), self.size)
+        last  = min(max(-(-(end - self.origin) // self.bucket), 0), self.size)
+        return first, last
+    
+    # adds a booking to the timeline. Inputs: the reservation and -1 to remove it instead
+    def add(self, reservation, value=1):
+        start = max(reservation.start, self.origin)
+        end   = min(reservation.end + self.pause, self.origin + self.size * self.bucket)
+        if end <= start:
+            return
+        
+        if reservation.seats not in self.busy_cars:
+            self.busy_cars[reservation.seats]    = MaxSegmentTree(self.size)
+            self.busy_seconds[reservation.seats] = FenwickTree(self.size)
+        busy_cars    = self.busy_cars[reservation.seats]
+        busy_seconds = self.busy_seconds[reservation.seats]
+        
+        first, last = self.buckets(start, end)
+        busy_cars.add(first, last, value)
+        
+        # the first and last bucket are only partly booked
+        if last - first == 1:
+            busy_seconds.add(first, last, value * (end - start))
+        else:
+            busy_seconds.add(first, first + 1, value * (self.origin + (first + 1) * self.bucket - start))
+            busy_seconds.add(first + 1, last - 1, value * self.bucket)
+            busy_seconds.add(last - 1, last, value * (end - self.origin - (last - 1) * self.bucket))
+            
+    def remove(self, reservation):
+        self.add(reservation, -1)
+        
+    # Returns the largest number of cars with the number of seats that are busy at the same time in the window
+    def peak(self, seats, start_ts, ends_ts):
+        first, last = self.buckets(to_epoch_seconds(start_ts), to_epoch_seconds(ends_ts))
+        if seats not in self.busy_cars or first >= last:
+            return 0
+        return self.busy_cars[seats].max(first, last)
+    
+    # Returns the number of cars with the number of seats that are free during the whole window, when the bookings may be reshuffled:
+    # the fewest free cars at any time in the window. Inputs: the number of seats and the start and end of the window
+    def available(self, seats, start_ts, ends_ts):
+        return self.cars.get(seats, 0) - self.peak(seats, start_ts, ends_ts)
+    
+    # Returns the share of the time of the cars with the number of seats that is booked in the window, rounded out to whole buckets
+    # Inputs: the number of seats and the start and end of the window
+    def utilization(self, seats, start_ts, ends_ts):
+        first, last = self.buckets(to_epoch_seconds(start_ts), to_epoch_seconds(ends_ts))
+        if seats not in self.busy_seconds or first >= last or not self.cars.get(seats):
+            return 0.0
+        return self.busy_seconds[seats].sum(first, last) / (self.cars[seats] * (last - first) * self.bucket)
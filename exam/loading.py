@@ -0,0 +1,178 @@
+# Reading the data files into a fleet, reservations and schedules
+
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from .fleet import Car, Fleet
+from .reservations import ReservationTable
+from .schedule import Schedule
+
+
+# The data files of one fleet (car.csv, model.csv, car_category.csv and trips.csv in a directory), read the first time they are
+# needed. Several datasets can be loaded in the same process, as nothing is kept in module globals
+#   data     = Dataset("data")
+#   schedule = data.schedule()
+#   schedule.reshuffle(minutes_pause=30)
+class Dataset:
+    def __init__(self, directory="data"):
+        self.directory = directory
+        
+    def read(self, name):
+        return pd.read_csv(f"{self.directory}/{name}", sep=";")
+    
+    @cached_property
+    def model_raw(self):
+        return self.read("model.csv")
+    
+    @cached_property
+    def car_category_raw(self):
+        return self.read("car_category.csv")
+    
+    @cached_property
+    def car_raw(self):
+        return self.read("car.csv")
+    
+    # the trips with the time stamps in UTC, sorted by start time
+    @cached_property
+    def trips_raw(self):
+        trips_raw = self.read("trips.csv")
+        trips_raw['start_ts'] = pd.to_datetime(trips_raw['start_ts'], utc=True)
+        trips_raw['ends_ts']  = pd.to_datetime(trips_raw['ends_ts'],  utc=True)
+        return trips_raw.sort_values(by='start_ts')
+    
+    # car, model and category information in one row per car
+    @cached_property
+    def car_table(self):
+        return build_car_table(self.car_raw, self.model_raw, self.car_category_raw)
+    
+    @cached_property
+    def fleet(self):
+        return load_fleet(self.car_table)
+    
+    # Returns a new schedule with all trips in the original schedule. Every call creates new Reservation objects,
+    # so schedules of the same data can be reshuffled independently
+    def schedule(self):
+        schedule = Schedule(self.trips_raw['start_ts'].min(), self.trips_raw['ends_ts'].max(), fleet=self.fleet)
+        with schedule.instrumentation.phase("load"):
+            for reservation in load_reservations(self.trips_raw, self.car_table):
+                schedule.add_reservation(reservation)
+        return schedule
+
+
+# Merges the car, model and category tables into one row per car with two joins. Input: the three raw dataframes
+def build_car_table(car_raw, model_raw, car_category_raw):
+    # drop the empty rows of car.csv
+    car_table = car_raw.dropna(subset=['car_id'])
+    car_table = car_table[['car_id', 'model_id', 'location_id', 'car_number', 'icon_url']]
+    car_table = car_table.astype({'car_id': np.int64, 'model_id': np.int64, 'car_number': np.int64})
+
+    # left joins keep the cars whose model is missing in model.csv
+    car_table = car_table.merge(model_raw[['model_id', 'model_name', 'category_id', 'seats']], on='model_id', how='left')
+    car_table = car_table.merge(car_category_raw[['category_id', 'category_name']], on='category_id', how='left')
+
+    return car_table
+
+
+# Builds the fleet from the merged car table, without searching the model and category dataframes per car
+def load_fleet(car_table):
+    fleet = Fleet()
+
+    columns = zip(car_table['car_id'].tolist(), car_table['model_id'].tolist(), car_table['location_id'].tolist(),
+                  car_table['car_number'].tolist(), car_table['icon_url'].tolist(), car_table['model_name'].tolist(),
+                  car_table['seats'].tolist(), car_table['category_id'].tolist(), car_table['category_name'].tolist())
+
+    for car_id, model_id, location_id, car_number, icon_url, model_name, seats, category_id, category_name in columns:
+        car = Car(car_id, model_id, location_id, car_number, icon_url)
+        # some models are missing in model.csv
+        if not np.isnan(seats):
+            car.set_model(model_name, int(seats), int(category_id), category_name)
+        fleet.add_car(car_id, car)
+
+    return fleet
+
+
+# Builds a ReservationTable from the trips dataframe, with start and end as integer seconds since epoch
+# Inputs: the trips dataframe with parsed timestamps and the merged car table
+def load_reservation_table(trips_raw, car_table):
+    # look up the seats and category of every trip's car with one join
+    trips = trips_raw[['trip_id', 'driven_km', 'start_ts', 'ends_ts', 'car_id']].merge(
+        car_table[['car_id', 'seats', 'category_id', 'category_name']], on='car_id', how='left')
+
+    # every reservation needs the number of seats of its car
+    missing = trips['seats'].isna()
+    if missing.any():
+        raise ValueError(f"{missing.sum()} trips belong to cars without a known model, e.g. car {trips['car_id'][missing].iloc[0]}")
+
+    categories = car_table.dropna(subset=['category_id'])
+    category_names = dict(zip(categories['category_id'].astype(np.int64).tolist(), categories['category_name'].tolist()))
+
+    return ReservationTable(trips['trip_id'].to_numpy(),
+                            trips['driven_km'].to_numpy(),
+                            trips['start_ts'].to_numpy(dtype='datetime64[s]').astype(np.int64),
+                            trips['ends_ts'].to_numpy(dtype='datetime64[s]').astype(np.int64),
+                            trips['car_id'].to_numpy(),
+                            trips['seats'].to_numpy(),
+                            trips['category_id'].to_numpy(),
+                            category_names)
+
+
+# Builds the Reservation objects from numpy columns. Inputs: the trips dataframe with parsed timestamps and the merged car table
+def load_reservations(trips_raw, car_table):
+    return load_reservation_table(trips_raw, car_table).to_reservations()
+
+
+# Reads a trips file in chunks and yields its bookings one time window at a time, in start-time order. Windows are aligned to
+# midnight UTC when window_hours divides 24. Only the windows that are not complete yet are kept in memory, so the memory use does
+# not grow with the size of the file. The file does not have to be sorted, as long as no booking comes more than max_lateness_hours
+# after a booking that starts later than it in the file
+# Inputs: the trips file, the merged car table, the window length, the number of rows to read at a time and the allowed disorder
+# Yields (start of the window as a Timestamp, ReservationTable of the window's bookings sorted by start)
+def stream_trip_windows(path, car_table, window_hours=24, chunksize=100_000, max_lateness_hours=24):
+    length   = int(window_hours * 3600)
+    lateness = int(max_lateness_hours * 3600)
+    
+    pending       = {}   # {window number: [ReservationTable]}, window n covers [n*length, (n+1)*length)
+    flushed_until = None # all windows before this number have been yielded
+    latest_start  = None
+    
+    for chunk in pd.read_csv(path, sep=";", chunksize=chunksize, usecols=['trip_id', 'driven_km', 'start_ts', 'ends_ts', 'car_id']):
+        if chunk.empty:
+            continue
+        
+        # parse the time stamps of this chunk only
+        chunk['start_ts'] = pd.to_datetime(chunk['start_ts'], utc=True)
+        chunk['ends_ts']  = pd.to_datetime(chunk['ends_ts'],  utc=True)
+        table = load_reservation_table(chunk, car_table)
+        
+        # a booking for a window that has already been yielded cannot be processed any more
+        numbers = table.start // length
+        if flushed_until is not None and numbers.min() < flushed_until:
+            raise ValueError(f"trip {table.trip_id[numbers.argmin()]} is more than {max_lateness_hours} hours out of order, increase max_lateness_hours")
+        
+        # sort the chunk into its windows
+        order  = np.argsort(numbers, kind="stable")
+        bounds = np.flatnonzero(np.diff(numbers[order])) + 1
+        for rows in np.split(order, bounds):
+            pending.setdefault(int(numbers[rows[0]]), []).append(table.take(rows))
+            
+        # every window that ends before the watermark is complete
+        latest_start  = table.start.max() if latest_start is None else max(latest_start, table.start.max())
+        flushed_until = (latest_start - lateness) // length
+        yield from flush_trip_windows(pending, flushed_until, length)
+        
+    # the end of the file completes the remaining windows
+    yield from flush_trip_windows(pending, None, length)
+    
+
+# Yields and removes the pending windows before the window number until (all of them if until is None), in time order
+# Inputs: the pending windows of stream_trip_windows, the first window number to keep and the window length in seconds
+def flush_trip_windows(pending, until, length):
+    for number in sorted(pending):
+        if until is not None and number >= until:
+            break
+        table = ReservationTable.concatenate(pending.pop(number))
+        table = table.take(np.argsort(table.start, kind="stable"))
+        yield pd.Timestamp(number * length, unit="s", tz="UTC"), table
+        
@@ -0,0 +1,176 @@
+# Reservations, one object per booking or many bookings in the columns of a ReservationTable
+
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+# Converts a timestamp to integer seconds since epoch. Integers are assumed to be epoch seconds already, and datetimes without
+# a time zone are taken as UTC. pandas is only imported for other types, such as strings
+def to_epoch_seconds(ts):
+    if isinstance(ts, (int, np.integer)):
+        return int(ts)
+    if isinstance(ts, datetime):
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=timezone.utc)
+        return (ts - EPOCH) // timedelta(seconds=1)
+    
+    import pandas as pd
+    return pd.Timestamp(ts).value // 10**9
+
+
+
+# A reservation object contains information about a reservation
+# __slots__ removes the per-object __dict__, which is most of the memory when there are millions of reservations
+class Reservation:
+    __slots__ = ("trip_id", "driven_km", "car_id", "start", "end", "seats", "category_id", "category_name")
+    
+    def __init__(self, trip_id, driven_km, start_ts, ends_ts, car_id, seats=None, category_id=None, category_name=None, fleet=None):
+        # store inputs
+        self.trip_id = trip_id # with trip_id, each reservation can be linked to trips.csv
+        self.driven_km = driven_km
+        self.car_id = car_id
+        
+        # store start and end as integer seconds since epoch. Timestamps are only created when asked for
+        # (the bulk loader already passes integers, which skips the conversion)
+        self.start = start_ts if type(start_ts) is int else to_epoch_seconds(start_ts)
+        self.end   = ends_ts  if type(ends_ts)  is int else to_epoch_seconds(ends_ts)
+        
+        # the bulk loader passes the car attributes directly
+        if seats is not None:
+            self.seats         = seats
+            self.category_id   = category_id
+            self.category_name = category_name
+            return
+        
+        # otherwise they are looked up in the fleet
+        if fleet is None:
+            raise ValueError(f"reservation {trip_id} needs the number of seats or the fleet to look them up in")
+        
+         # add number of seats
+        # none of the bookings are of the cars that are missing information about the car model. Therefore, no if/else or try/catch is needed
+        self.seats         = fleet.cars[car_id].seats
+        self.category_id   = fleet.cars[car_id].category_id
+        self.category_name = fleet.cars[car_id].category_name
+        
+    # duration in hours
+    @property
+    def duration_hours(self):
+        return (self.end - self.start) / 3600
+        
+    @property
+    def start_ts(self):
+        import pandas as pd
+        return pd.Timestamp(self.start, unit="s", tz="UTC")
+    
+    @property
+    def ends_ts(self):
+        import pandas as pd
+        return pd.Timestamp(self.end, unit="s", tz="UTC")
+    
+    
+
+# A reservation table holds many reservations as one numpy array per attribute (a struct of arrays).
+# It needs a fraction of the memory of Reservation objects and is the input of the vectorized calculations
+class ReservationTable:
+    # the columns and their types
+    columns = {
+        "trip_id":     np.int64,
+        "driven_km":   np.float64,
+        "start":       np.int64, # seconds since epoch
+        "end":         np.int64, # seconds since epoch
+        "car_id":      np.int64,
+        "seats":       np.int16,
+        "category_id": np.int16,
+    }
+    
+    def __init__(self, trip_id, driven_km, start, end, car_id, seats, category_id, category_names=None):
+        self.trip_id     = np.asarray(trip_id,     dtype=self.columns["trip_id"])
+        self.driven_km   = np.asarray(driven_km,   dtype=self.columns["driven_km"])
+        self.start       = np.asarray(start,       dtype=self.columns["start"])
+        self.end         = np.asarray(end,         dtype=self.columns["end"])
+        self.car_id      = np.asarray(car_id,      dtype=self.columns["car_id"])
+        self.seats       = np.asarray(seats,       dtype=self.columns["seats"])
+        self.category_id = np.asarray(category_id, dtype=self.columns["category_id"])
+        
+        # category names are stored once per category instead of once per reservation
+        self.category_names = category_names if category_names is not None else {} # {category_id: category_name}
+        
+    def __len__(self):
+        return len(self.start)
+    
+    # the memory used by the arrays in bytes
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self.columns)
+    
+    # durations of all reservations in hours
+    @property
+    def duration_hours(self):
+        return (self.end - self.start) / 3600
+    
+    # builds a table from reservation objects. Input: a list of reservations and optionally the car id to store for each
+    # (a schedule's dictionary key can differ from reservation.car_id, because reshuffling changes reservation.car_id)
+    @classmethod
+    def from_reservations(cls, reservations, car_ids=None):
+        if car_ids is None:
+            car_ids = [r.car_id for r in reservations]
+            
+        return cls([r.trip_id for r in reservations],
+                   [r.driven_km for r in reservations],
+                   [r.start for r in reservations],
+                   [r.end for r in reservations],
+                   car_ids,
+                   [r.seats for r in reservations],
+                   [r.category_id for r in reservations],
+                   {r.category_id: r.category_name for r in reservations})
+    
+    # returns a new table with the selected rows. Input: an index or boolean mask as accepted by numpy
+    def take(self, rows):
+        return ReservationTable(*(getattr(self, name)[rows] for name in self.columns), self.category_names)
+    
+    # joins several tables into one. Input: a list of tables
+    @classmethod
+    def concatenate(cls, tables):
+        category_names = {}
+        for table in tables:
+            category_names.update(table.category_names)
+            
+        return cls(*(np.concatenate([getattr(table, name) for table in tables]) for name in cls.columns), category_names)
+    
+    # returns the reservation in row i as a Reservation object
+    def reservation(self, i):
+        category_id = int(self.category_id[i])
+        return Reservation(int(self.trip_id[i]), float(self.driven_km[i]), int(self.start[i]), int(self.end[i]), int(self.car_id[i]),
+                           int(self.seats[i]), category_id, self.category_names.get(category_id))
+    
+    # returns all rows as Reservation objects
+    def to_reservations(self):
+        names = self.category_names
+        columns = zip(self.trip_id.tolist(), self.driven_km.tolist(), self.start.tolist(), self.end.tolist(), self.car_id.tolist(),
+                      self.seats.tolist(), self.category_id.tolist())
+        
+        return [Reservation(trip_id, driven_km, start, end, car_id, seats, category_id, names.get(category_id))
+                for trip_id, driven_km, start, end, car_id, seats, category_id in columns]
+    
+    # writes every column to <directory>/<column>.npy and the category names to <directory>/categories.json
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in self.columns:
+            np.save(os.path.join(directory, name + ".npy"), getattr(self, name))
+        with open(os.path.join(directory, "categories.json"), "w") as file:
+            json.dump({str(category_id): name for category_id, name in self.category_names.items()}, file)
+            
+    # reads a table written by save. With mmap_mode="r" the columns are memory-mapped, so nothing is read until it is used
+    # and the pages are shared with other processes. Inputs: the directory and the mmap_mode of np.load (None reads the arrays)
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        with open(os.path.join(directory, "categories.json")) as file:
+            category_names = {int(category_id): name for category_id, name in json.load(file).items()}
+            
+        return cls(*(np.load(os.path.join(directory, name + ".npy"), mmap_mode=mmap_mode) for name in cls.columns), category_names)
+    
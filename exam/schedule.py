@@ -0,0 +1,1012 @@
+# The schedule before and after reshuffling, the reshuffle engines and the online changes to a reshuffled schedule
+
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from itertools import chain
+
+import numpy as np
+
+from .engines import RESHUFFLE_ORDERS, batch_chains, max_overlapping, max_served_bookings, split_rolling_windows, sweep_assign
+from .fleet import Fleet, location_of
+from .instrumentation import Instrumentation
+from .intervals import IntervalIndex, OccupancyTimeline
+from .metrics import calculate_fleet_metrics
+from .reservations import EPOCH, ReservationTable, to_epoch_seconds
+
+
+# Reshuffles one group of interchangeable bookings in a worker process, using a schedule of its own
+# Inputs: the bookings in the order they are placed, the cars in order of preference, the intended pause between each booking, the engine,
+# for the optimal engine the time limit and the group's label, whether to count like an instrumented schedule and the carry-over
+# of Schedule.reshuffle. Returns the new car id of each booking (None for a leftover booking), the optimality rows of the optimal engine and the counters
+def reshuffle_group(reservations, applicable_cars, minutes_pause, engine, time_limit=None, label=None, instrumented=False, carry=None):
+    schedule = Schedule(None, None)
+    schedule.carry = carry or {}
+    if instrumented:
+        schedule.instrumentation.enable()
+    
+    if engine == "first_fit":
+        schedule.reshuffle_first_fit(reservations, applicable_cars, minutes_pause=minutes_pause)
+    elif engine == "sweep":
+        schedule.reshuffle_sweep(reservations, applicable_cars, minutes_pause=minutes_pause)
+    else:
+        schedule.reshuffle_optimal(reservations, applicable_cars, minutes_pause=minutes_pause, time_limit=time_limit, label=label)
+        
+    leftovers = {id(booking) for booking in schedule.leftover_trips}
+    car_ids   = [None if id(booking) in leftovers else booking.car_id for booking in reservations]
+    return car_ids, schedule.optimality, schedule.instrumentation.counters
+
+
+# Reshuffles one window of a rolling horizon, with the cars that are still busy from the windows before it kept busy.
+# The bookings of the overlap after the window are planned with it, so its plan leaves room for them, but only the window's own
+# bookings are kept: the others are taken out of its schedule again, keep their car, and are planned by the next window
+# Inputs: the bookings that start in the window, the bookings of the overlap, the fleet, the carry-over from the windows before
+# ({car_id: end of the car's last booking}), the end of the window, the options of Schedule.reshuffle and whether to count
+# like an instrumented schedule. Returns the window's schedule, the new car id of each of the window's bookings
+# (None for a leftover booking) and the carry-over into the next window
+def reshuffle_window(reservations, lookahead, fleet, carry, window_end, minutes_pause=0, engine="first_fit", sort_by="duration", fleet_caps=None,
+                     instrumented=False):
+    if engine not in ("first_fit", "sweep"):
+        raise ValueError(f"the rolling horizon supports the first_fit and sweep engines, not {engine}")
+        
+    schedule = Schedule(EPOCH + timedelta(seconds=min(booking.start for booking in reservations)),
+                        EPOCH + timedelta(seconds=max(booking.end for booking in reservations)), fleet=fleet)
+    if instrumented:
+        schedule.instrumentation.enable()
+        
+    for booking in chain(reservations, lookahead):
+        schedule.add_reservation(booking)
+    lookahead_car_ids = [booking.car_id for booking in lookahead]
+    
+    schedule.reshuffle(minutes_pause=minutes_pause, engine=engine, sort_by=sort_by, fleet_caps=fleet_caps, carry=carry)
+    leftovers = {id(booking) for booking in schedule.leftover_trips}
+    
+    # take the bookings of the overlap out again
+    if lookahead:
+        planned = {id(booking) for booking in lookahead}
+        for booking, car_id in zip(lookahead, lookahead_car_ids):
+            if id(booking) not in leftovers:
+                schedule.remove_reservation(booking, specified_schedule="reshuffled_trips")
+            booking.car_id = car_id
+        schedule.leftover_trips = [booking for booking in schedule.leftover_trips if id(booking) not in planned]
+        schedule.trips = {car_id: kept for car_id, bookings in schedule.trips.items()
+                          if (kept := [booking for booking in bookings if id(booking) not in planned])}
+        
+    car_ids = [None if id(booking) in leftovers else booking.car_id for booking in reservations]
+    
+    # each car is busy until the end of its last booking. Cars that are free again when the window ends are dropped,
+    # so the carry-over never holds more than one entry per car
+    busy_until = dict(carry)
+    for booking, car_id in zip(reservations, car_ids):
+        if car_id is not None:
+            busy_until[car_id] = max(busy_until.get(car_id, booking.end), booking.end)
+    carry = {car_id: end for car_id, end in busy_until.items() if end + minutes_pause * 60 > window_end}
+    
+    return schedule, car_ids, carry
+
+
+# Reshuffles chains of windows of a rolling horizon, the windows of each chain one after the other, in a worker process or in the calling one.
+# Each chain starts with no car busy from before it
+# Inputs: chains of windows of split_rolling_windows, the fleet (only the cars of the chains' seat group is enough), the options of
+# Schedule.reshuffle and whether to count like an instrumented schedule
+# Returns the new car id of each booking of the chains, in order (None for a leftover booking), and the counters of the engines
+def reshuffle_chains(chains, fleet, minutes_pause, engine, sort_by="duration", fleet_caps=None, instrumented=False):
+    car_ids  = []
+    counters = {}
+    
+    for windows in chains:
+        carry = {}
+        for window_start, window_end, reservations, lookahead in windows:
+            schedule, window_car_ids, carry = reshuffle_window(reservations, lookahead, fleet, carry, window_end, minutes_pause, engine, sort_by,
+                                                               fleet_caps, instrumented)
+            car_ids.extend(window_car_ids)
+            for name, n in schedule.instrumentation.counters.items():
+                counters[name] = counters.get(name, 0) + n
+            
+    # the bookings are added and placed again by the schedule the chain belongs to, and the leftovers are counted there
+    for name in ("reservations_added", "bookings_placed", "leftover_bookings"):
+        counters.pop(name, None)
+    return car_ids, counters
+
+
+
+# An attribute of a schedule that holds Reservation objects. The objects of a loaded snapshot are only created the first time
+# one of these attributes is used (see Schedule.load and Schedule.materialize)
+def snapshot_attribute(name):
+    def get(self):
+        if self.snapshot is not None:
+            self.materialize()
+        return self.__dict__[name]
+    
+    def set(self, value):
+        if self.snapshot is not None:
+            self.materialize()
+        self.__dict__[name] = value
+        
+    return property(get, set)
+
+
+
+# A Schedule object is able to calculate the necessary metrics to analyze usage after reshuffling
+# it it also implements the reshuffling algorithm
+# The fleet is needed to reshuffle and to place bookings, but not to report on or check a schedule
+class Schedule:
+    trips            = snapshot_attribute("trips")
+    reshuffled_trips = snapshot_attribute("reshuffled_trips")
+    reshuffled_index = snapshot_attribute("reshuffled_index")
+    leftover_trips   = snapshot_attribute("leftover_trips")
+    
+    def __init__(self, earliestStart, latestEnd, fleet=None):
+        # the arrays of a loaded snapshot that the Reservation objects have not been created from yet
+        self.snapshot = None
+        
+        self.earliestStart = earliestStart 
+        self.latestEnd     = latestEnd
+        self.fleet         = fleet
+        
+        # the time each car is busy until with bookings from before the schedule's period, set by reshuffle
+        self.carry = {} # {car_id: end of the car's last booking}
+        
+        # to store the original schedule
+        self.trips = {} # {car_id: [reservation]}
+        
+        # tables of a loaded snapshot, used by to_table until the schedule changes
+        self.tables = {} # {specified_schedule: ReservationTable}
+        
+        # counters and timings, off until instrumentation.enable() is called
+        self.instrumentation = Instrumentation()
+        
+        # occupancy of the reshuffled schedule, kept up to date once build_timeline has been called
+        self.timeline = None
+        
+        # to store the reshuffled schedule and leftover reservations
+        self.initialize_reshuffled_trips()
+        
+    def initialize_reshuffled_trips(self):
+        # to store the reshuffled schedule
+        self.reshuffled_trips = {}
+        self.tables.pop("reshuffled_trips", None)
+        if self.timeline is not None:
+            self.timeline.clear()
+        # sorted booking times of each car in the reshuffled schedule, used for fast overlap checks
+        self.reshuffled_index = {} # {car_id: IntervalIndex}
+        # to store reservations that does not fit the schedule of any applicable car after reshuffling
+        self.leftover_trips = []
+        # the optimal engine's comparison with the sweep engine, one row per group of interchangeable bookings
+        self.optimality = []
+        
+    # Returns the specified schedule as a ReservationTable. The car_id column holds the car each reservation is scheduled on
+    def to_table(self, specified_schedule="trips"):
+        # the memory-mapped table of a snapshot, if the schedule has not changed since it was loaded
+        if specified_schedule in self.tables:
+            return self.tables[specified_schedule]
+        
+        if specified_schedule=="trips":
+            bookings = self.trips
+        elif specified_schedule=="reshuffled_trips":
+            bookings = self.reshuffled_trips
+            
+        reservations = [reservation for sublist in bookings.values() for reservation in sublist]
+        car_ids      = [car_id for car_id, sublist in bookings.items() for _ in sublist]
+        
+        return ReservationTable.from_reservations(reservations, car_ids=car_ids)
+        
+    # Returns the productive time before or after the bookings have been reshuffled, depending on input
+    # inputs are a car object and the specified schedule
+    def calculate_productive_time(self, car, specified_schedule="trips"):     
+        car_id = car.car_id
+        
+        # Make it possible to calculate the metric before and after reshuffling
+        if specified_schedule=="trips":
+            bookings = self.trips[car_id]
+        elif specified_schedule=="reshuffled_trips":
+            bookings = self.reshuffled_trips[car_id]
+
+        productive_time = 0
+        # add all occupied time
+        for i in range(len(bookings)):
+            productive_time += bookings[i].duration_hours
+        
+        return productive_time
+    
+        
+        
+    # Returns the unusable time before or after the bookings have been reshuffled, depending on input  
+    # inputs are a car object and the specified schedule
+    def calculate_unusable_time(self, car, specified_schedule="trips"):
+        car_id = car.car_id    
+
+        # bookings = the specified schedule
+        if specified_schedule=="trips":
+            bookings = self.trips[car_id]
+        elif specified_schedule=="reshuffled_trips":
+            bookings = self.reshuffled_trips[car_id]    
+            
+
+        unusable_time = 0
+        
+        # add unusable time time between bookings
+        for i in range(len(bookings)-1):    
+            time_clearance_hours = (bookings[i+1].start - bookings[i].end) / 3600
+            # add 30 minutes or the time between the bookings if the time clearance is less than 0.5 hours
+            unusable_time += min(0.5, time_clearance_hours)
+            
+        return unusable_time
+        
+    #Returns the idle time before or after the bookings have been reshuffled, depending on input
+    # inputs are a car object and the specified schedule
+    def calculate_idle_time(self, car, specified_schedule="trips"):
+        car_id = car.car_id    
+
+        # bookings = the specified schedule
+        if specified_schedule=="trips":
+            bookings = self.trips[car_id]
+        elif specified_schedule=="reshuffled_trips":
+            bookings = self.reshuffled_trips[car_id]
+
+        # sort bookings by start_ts to calculate the time between bookings
+        bookings.sort(key=lambda reservation: reservation.start)
+
+        # calculate the time between the first and last booking of the fleet
+        total_period_hours = (self.latestEnd - self.earliestStart).total_seconds() / 3600
+        
+        total_idle_time = total_period_hours
+        # subtract actuall occupied time
+        total_idle_time -= self.calculate_productive_time(car, specified_schedule=specified_schedule)
+        # subtract unusable time between bookings
+        total_idle_time -= self.calculate_unusable_time(car, specified_schedule=specified_schedule)
+            
+        return total_idle_time
+    
+    
+    #Returns the wasted time before or after the bookings have been reshuffled, depending on input
+    # inputs are a car object and the specified schedule
+    def calculate_wasted_time(self, car, specified_schedule="trips"):
+        car_id = car.car_id 
+        
+        # bookings = the specified schedule
+        if specified_schedule=="trips":
+            bookings = self.trips[car_id]
+        elif specified_schedule=="reshuffled_trips":
+            bookings = self.reshuffled_trips[car_id]
+            
+        wasted_time = 0
+        
+        # for each booking, if the duratio is lees than 30 minutes, add the duration to wasted time
+        for i in range(len(bookings)):
+            duration = bookings[i].duration_hours
+            if duration < 0.5:
+                wasted_time += duration
+                
+        return wasted_time
+    
+    
+    # Returns the utilization of the cars in terms of percentage of total available hours
+    # inputs are a car object and the specified schedule
+    def calculate_utilization(self, car, specified_schedule="trips"):
+        # utilization = (productive time + unusable time) / total time period
+        
+        # calculate productive time
+        productive_time = self.calculate_productive_time(car, specified_schedule=specified_schedule)
+        # calculate unusable time
+        unusable_time   = self.calculate_unusable_time(car, specified_schedule=specified_schedule)
+        
+        # calculate total time period
+        total_period_hours = (self.latestEnd - self.earliestStart).total_seconds() / 3600
+        
+        # calculate utilization
+        return (productive_time + unusable_time) / total_period_hours
+
+        
+    #Adds a new reservation to designated schedule. Input: a new reservation and the specified schedule 
+    def add_reservation(self, reservation, specified_schedule="trips"):        
+        car_id = reservation.car_id
+        
+        if self.instrumentation.enabled:
+            self.instrumentation.count("reservations_added" if specified_schedule=="trips" else "bookings_placed")
+        if self.tables:
+            self.tables.pop(specified_schedule, None)
+        
+        # Add the reservation to the specified schedule
+        # if the chosen schedule is the standard one
+        if specified_schedule=="trips":
+            # if the car alread has at least one booking
+            if car_id in self.trips:
+                self.trips[car_id].append(reservation)
+            # if this is the first booking of the car
+            else:
+                self.trips[car_id] = [reservation]
+            
+        # if the chosen schedule is the new reshuffled one
+        elif specified_schedule=="reshuffled_trips":
+            # if the car alread has at least one booking
+            if car_id in self.reshuffled_trips:
+                self.reshuffled_trips[car_id].append(reservation)
+            # if this is the first booking of the car
+            else:
+                self.reshuffled_trips[car_id] = [reservation]
+                self.reshuffled_index[car_id] = IntervalIndex()
+
+            # keep the car's interval index up to date
+            self.reshuffled_index[car_id].insert(reservation.start, reservation.end, reservation)
+            if self.timeline is not None:
+                self.timeline.add(reservation)
+                
+                
+    #Removes a reservation from the designated schedule. Input: the reservation and the specified schedule
+    # Cars without any bookings left are removed from the schedule, so the number of keys stays the number of cars in use
+    def remove_reservation(self, reservation, specified_schedule="trips"):
+        self.tables.pop(specified_schedule, None)
+        
+        if specified_schedule=="trips":
+            # reshuffling changes reservation.car_id, so the car of the original schedule has to be searched for
+            for car_id, bookings in self.trips.items():
+                if reservation in bookings:
+                    break
+            else:
+                raise ValueError(f"reservation {reservation.trip_id} is not in the schedule")
+            
+            bookings.remove(reservation)
+            if not bookings:
+                del self.trips[car_id]
+            
+        elif specified_schedule=="reshuffled_trips":
+            car_id = reservation.car_id
+            
+            self.reshuffled_trips[car_id].remove(reservation)
+            self.reshuffled_index[car_id].remove(reservation.start, reservation.end, reservation)
+            if self.timeline is not None:
+                self.timeline.remove(reservation)
+            if not self.reshuffled_trips[car_id]:
+                del self.reshuffled_trips[car_id]
+                del self.reshuffled_index[car_id]
+                
+                
+    # Returns the fleet of the schedule, for the methods that need it
+    def get_fleet(self):
+        if self.fleet is None:
+            raise ValueError("the schedule has no fleet, create it with Schedule(earliestStart, latestEnd, fleet=fleet)")
+        return self.fleet
+    
+    
+    # Creates the occupancy timeline of the reshuffled schedule. From then on add_reservation and remove_reservation keep it up to date,
+    # and reshuffle fills it again. Inputs: the bucket length and the pause after each booking in minutes. Returns the timeline
+    def build_timeline(self, bucket_minutes=15, minutes_pause=0):
+        fleet = self.get_fleet()
+        cars = {seats: len(cars) for seats, cars in fleet.build_index("seats").items()}
+        self.timeline = OccupancyTimeline(self.earliestStart, self.latestEnd, cars, bucket_minutes=bucket_minutes, minutes_pause=minutes_pause)
+        
+        for reservations in self.reshuffled_trips.values():
+            for reservation in reservations:
+                self.timeline.add(reservation)
+                
+        return self.timeline
+    
+    
+    # Checks what car can fit a specific booking in ints schedule  
+    # inputs, the new reservation, the car object, and intended pause between each booking
+    def can_accommodate_reservation(self, reservation, car, minutes_pause=0):      
+        # Calculate adjusted start time (in seconds since epoch, as stored in the interval index)
+        pause     = minutes_pause * 60
+        adj_start = reservation.start - pause
+        adj_end   = reservation.end   + pause
+        car_id    = car.car_id
+        
+        if self.instrumentation.enabled:
+            self.instrumentation.count("overlap_checks")
+            
+        # the car is still busy with a booking from before the schedule's period
+        if car_id in self.carry and self.carry[car_id] > adj_start:
+            return False
+        
+        # if the car_id has not been added to the schedule
+        if car_id not in self.reshuffled_index:
+            return True
+        
+        # binary search the car's bookings for an overlapping booking
+        return not self.reshuffled_index[car_id].overlaps(adj_start, adj_end)
+            
+            
+    #Reshuffles the bookings into a more optimal schedule. Inputs: the intended pause between each booking and the engine to use
+    # engine="first_fit": places the longest bookings first, each in the first car (cheapest first) that has room for it
+    # engine="sweep":     goes through the bookings by start time and gives each one the cheapest car that is free,
+    #                     which uses the minimum number of cars for each number of seats
+    # engine="optimal":   places as many bookings as possible on the fewest cars, and reports the gap between that and the sweep
+    #                     engine per group in optimality_report(). time_limit is the solver's limit in seconds for each group
+    # workers > 1 solves the seat groups in a process pool, one task per group, so it helps when there are several large groups.
+    # A group is not split in time: each engine's choices depend on the bookings placed before, and the sweep is already O(n log C).
+    # The plan is the same as the serial run. For the optimal engine that only holds when the solver finishes each group within
+    # time_limit in both runs, since a group that hits the limit keeps the sweep plan, and busy worker processes are slower
+    # by_location=True only moves a booking between cars at the location of the car it was booked on. Leftover bookings can then be
+    # placed at the neighbouring locations given in neighbor_locations ({location_id: [location_id]}, in order of preference)
+    # When self.instrumentation is enabled, the phases are timed (and profiled, if asked for) and the engines count their work
+    # sort_by is one of RESHUFFLE_ORDERS, the order the bookings are placed in. fleet_caps ({seats: number of cars}) only lets
+    # the cheapest cars of each group take bookings, to see whether the fleet can shrink
+    # carry ({car_id: end of the car's last booking}) keeps cars busy with bookings placed before the schedule's period, plus the pause
+    # (see reshuffle_rolling). The optimal engine does not support it
+    def reshuffle(self, minutes_pause=0, engine="first_fit", workers=None, by_location=False, neighbor_locations=None, time_limit=10,
+                  sort_by="duration", fleet_caps=None, carry=None):  
+        if engine not in ("first_fit", "sweep", "optimal"):
+            raise ValueError(f"unknown reshuffle engine: {engine}")
+        if sort_by not in RESHUFFLE_ORDERS:
+            raise ValueError(f"unknown booking order: {sort_by}")
+        if carry and engine == "optimal":
+            raise ValueError("the optimal engine can not start from cars that are already busy, use the first_fit or sweep engine")
+        fleet = self.get_fleet()
+        self.carry = carry or {}
+        
+        with self.instrumentation.phase("reshuffle", capture=True):
+            with self.instrumentation.phase("grouping"):
+                #################################################
+                # sort by duration and group by number of seats #
+                #################################################
+                # Flatten the dictionary into one long list, and add any leftover reservations
+                # the original car is kept with each booking, since reshuffling changes reservation.car_id
+                flattened_list = [(reservation, car_id) for car_id, sublist in self.trips.items() for reservation in sublist]
+        
+                # initialize the reshuffled schedule
+                self.initialize_reshuffled_trips()
+
+                # Sort the flattened list by duration_hours (or the order given by sort_by)
+                order, reverse = RESHUFFLE_ORDERS[sort_by]
+                flattened_list.sort(key=lambda x: order(x[0]), reverse=reverse)
+
+                # Group the sorted list by reservation.seats, and by the location of the original car if asked for
+                grouped_reservations = {} # {seats or (seats, location_id): [reservation]}
+                for reservation, car_id in flattened_list:
+                    key = (reservation.seats, location_of(fleet.cars[car_id])) if by_location else reservation.seats
+                    if key in grouped_reservations:
+                        grouped_reservations[key].append(reservation)
+                    else:
+                        grouped_reservations[key] = [reservation]
+                
+                # find a list of cars that can accommodate each group (cars with the correct number of seats, at the right location)
+                # sort the cars by cheapest first
+                groups = [] # [(key, reservations, applicable_cars)]
+                for key, reservations in grouped_reservations.items():
+                    if by_location:
+                        applicable_cars = fleet.get_cars_by_seats_and_location(*key, sort_by="category_id")
+                    else:
+                        applicable_cars = fleet.get_cars_by_seats(key, sort_by="category_id")
+                    # keep only the cheapest cars if the fleet is capped
+                    if fleet_caps and reservations[0].seats in fleet_caps:
+                        applicable_cars = applicable_cars[:fleet_caps[reservations[0].seats]]
+                    groups.append((key, reservations, applicable_cars))
+
+            #############
+            # RESHUFLLE #
+            #############
+            with self.instrumentation.phase("engine"):
+                if workers is not None and workers > 1:
+                    self.reshuffle_parallel(groups, minutes_pause, engine, workers, time_limit)
+                else:
+                    # for each group of reservations with the same number of seats (each set of of interchangeable reservations)
+                    for key, reservations, applicable_cars in groups:
+                        if engine == "first_fit":
+                            self.reshuffle_first_fit(reservations, applicable_cars, minutes_pause=minutes_pause)
+                        elif engine == "sweep":
+                            self.reshuffle_sweep(reservations, applicable_cars, minutes_pause=minutes_pause)
+                        else:
+                            self.reshuffle_optimal(reservations, applicable_cars, minutes_pause=minutes_pause, time_limit=time_limit, label=key)
+
+            if by_location and neighbor_locations:
+                with self.instrumentation.phase("neighbor_placement"):
+                    self.place_at_neighbor_locations(grouped_reservations, neighbor_locations, minutes_pause=minutes_pause)
+            
+            if self.instrumentation.enabled:
+                self.instrumentation.count("leftover_bookings", len(self.leftover_trips))
+                    
+                    
+    # Places leftover bookings of a location-based reshuffle at neighbouring locations, trying the neighbours in the given order
+    # and the cars of each neighbour cheapest first. Inputs: the bookings grouped by (seats, location_id), the neighbours
+    # of each location ({location_id: [location_id]}) and the intended pause between each booking
+    def place_at_neighbor_locations(self, grouped_reservations, neighbor_locations, minutes_pause=0):
+        fleet     = self.get_fleet()
+        leftovers = {id(booking) for booking in self.leftover_trips}
+        placed    = set()
+        
+        for (seats, location_id), reservations in grouped_reservations.items():
+            neighbor_cars = [car for neighbor in neighbor_locations.get(location_id, [])
+                             for car in fleet.get_cars_by_seats_and_location(seats, neighbor, sort_by="category_id")]
+            
+            for booking in reservations:
+                if id(booking) not in leftovers:
+                    continue
+                for car in neighbor_cars:
+                    if self.can_accommodate_reservation(booking, car, minutes_pause=minutes_pause):
+                        booking.car_id = car.car_id
+                        self.add_reservation(booking, specified_schedule="reshuffled_trips")
+                        placed.add(id(booking))
+                        break
+                    
+        self.leftover_trips = [booking for booking in self.leftover_trips if id(booking) not in placed]
+                    
+                    
+    # Places each booking in the first car that can accommodate it. Inputs: the bookings in the order to place them,
+    # the cars in order of preference, and the intended pause between each booking
+    def reshuffle_first_fit(self, reservations, applicable_cars, minutes_pause=0):
+        # iterate through the cars and fill as densely in the first cars as possible
+        for booking in reservations:
+            allocated = False
+            probes    = len(applicable_cars)
+            # Find the first car that can accommodate this booking
+            for i, car in enumerate(applicable_cars):                    
+                if self.can_accommodate_reservation(booking, car, minutes_pause=minutes_pause):
+                    # change the car id
+                    booking.car_id = car.car_id
+                    # Add the booking to this car
+                    self.add_reservation(booking, specified_schedule="reshuffled_trips")
+                    allocated = True
+                    probes    = i + 1
+                    break
+                
+            if self.instrumentation.enabled:
+                self.instrumentation.count("cars_probed", probes)
+
+            # handle leftover bookings
+            if not allocated:
+                self.leftover_trips.append(booking)
+                print("added leftover booking")
+                
+                
+    # Goes through the bookings by start time and gives each one the free car that comes first in applicable_cars, in O(log C) per booking.
+    # Because the lowest ranked free car is always taken, a new car is only used when all cars before it are busy,
+    # and the number of cars used equals the largest number of overlapping bookings (including the pause)
+    # Inputs: the bookings, the cars in order of preference, and the intended pause between each booking
+    def reshuffle_sweep(self, reservations, applicable_cars, minutes_pause=0):
+        reservations = sorted(reservations, key=lambda reservation: reservation.start)
+        busy_until   = {rank: self.carry[car.car_id] + minutes_pause * 60 for rank, car in enumerate(applicable_cars) if car.car_id in self.carry}
+        ranks        = sweep_assign(reservations, len(applicable_cars), minutes_pause * 60, busy_until)
+        
+        for booking, rank in zip(reservations, ranks):
+            # handle leftover bookings
+            if rank is None:
+                self.leftover_trips.append(booking)
+                continue
+                
+            # give the booking to the cheapest free car
+            booking.car_id = applicable_cars[rank].car_id
+            self.add_reservation(booking, specified_schedule="reshuffled_trips")
+            
+        # the free car is taken from a heap, so every placed booking probes one car
+        if self.instrumentation.enabled:
+            self.instrumentation.count("cars_probed", sum(rank is not None for rank in ranks))
+            
+            
+    # Places the largest possible number of bookings on the cars, using the fewest and cheapest cars, and records how far the
+    # sweep engine is from that in self.optimality. When the sweep engine places every booking it is optimal: it uses as many cars
+    # as the largest number of overlapping bookings, which is a lower bound, and those are the cheapest cars. Otherwise
+    # max_served_bookings looks for a better choice of bookings within the time limit. The sweep result is only a fallback: it is
+    # kept when the solver fails or stops at the time limit, and the solver does not start from it
+    # Inputs: the bookings, the cars in order of preference, the intended pause between each booking, the solver's time limit
+    # in seconds and a label for the group in the optimality report
+    def reshuffle_optimal(self, reservations, applicable_cars, minutes_pause=0, time_limit=10, label=None):
+        start_time = time.perf_counter()
+        pause = minutes_pause * 60
+        
+        ordered = sorted(reservations, key=lambda reservation: reservation.start)
+        starts  = np.array([booking.start for booking in ordered], dtype=np.int64)
+        ends    = np.array([booking.end for booking in ordered], dtype=np.int64)
+        
+        # the fast path: the sweep engine
+        ranks         = sweep_assign(ordered, len(applicable_cars), pause)
+        greedy_served = sum(rank is not None for rank in ranks)
+        greedy_cars   = len({rank for rank in ranks if rank is not None})
+        
+        if greedy_served == len(ordered):
+            status         = "sweep is optimal"
+            optimal_served = greedy_served
+        else:
+            chosen, status = max_served_bookings(starts, ends, len(applicable_cars), pause, time_limit)
+            optimal_served = None if chosen is None else int(chosen.sum())
+            
+            # use the optimal choice of bookings if it serves more of them. The chosen bookings never overlap more than the number
+            # of cars, so the sweep places all of them
+            if optimal_served is not None and optimal_served > greedy_served:
+                chosen_bookings = [booking for booking, keep in zip(ordered, chosen) if keep]
+                chosen_ranks    = dict(zip(map(id, chosen_bookings), sweep_assign(chosen_bookings, len(applicable_cars), pause)))
+                ranks = [chosen_ranks.get(id(booking)) for booking in ordered]
+                
+        # place the bookings in the order they were given
+        rank_of = dict(zip(map(id, ordered), ranks))
+        for booking in reservations:
+            rank = rank_of[id(booking)]
+            if rank is None:
+                self.leftover_trips.append(booking)
+            else:
+                booking.car_id = applicable_cars[rank].car_id
+                self.add_reservation(booking, specified_schedule="reshuffled_trips")
+                
+        served = sum(rank is not None for rank in ranks)
+        if self.instrumentation.enabled:
+            self.instrumentation.count("cars_probed", served)
+            
+        self.optimality.append({
+            "Group":                    label,
+            "Number of reservations":   len(ordered),
+            "Cars available":           len(applicable_cars),
+            "Lower bound on cars":      min(max_overlapping(starts, ends, pause), len(applicable_cars)),
+            "Cars used by sweep":       greedy_cars,
+            "Cars used":                len({rank for rank in ranks if rank is not None}),
+            "Leftovers of sweep":       len(ordered) - greedy_served,
+            "Leftover bookings":        len(ordered) - served,
+            # the share of the bookings an optimal plan serves that the sweep engine does not serve
+            "Optimality gap":           None if optimal_served is None else (optimal_served - greedy_served) / max(optimal_served, 1),
+            "Status":                   status,
+            "Runtime (s)":              time.perf_counter() - start_time,
+        })
+        
+        
+    # Returns the optimality rows recorded by the optimal engine as a dataframe, one row per group of interchangeable bookings
+    def optimality_report(self):
+        import pandas as pd
+        return pd.DataFrame(self.optimality)
+            
+            
+    # Solves the groups in a process pool and merges the results back in the order the serial run would place the bookings
+    # The groups use disjoint sets of cars, so they do not interact
+    # Inputs: a list of (key, bookings, applicable cars), the intended pause between each booking, the engine, the number of processes
+    # and the time limit of the optimal engine
+    def reshuffle_parallel(self, groups, minutes_pause, engine, workers, time_limit=10):
+        tasks = [] # [(bookings in the order they are placed, future with the car id of each booking and the optimality rows)]
+        
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for key, reservations, applicable_cars in groups:
+                # the sweep engine places the bookings by start time
+                if engine == "sweep":
+                    reservations = sorted(reservations, key=lambda reservation: reservation.start)
+                tasks.append((reservations, executor.submit(reshuffle_group, reservations, applicable_cars, minutes_pause, engine, time_limit, key,
+                                                            self.instrumentation.enabled, self.carry)))
+                    
+            # merge the results in the same order as the serial run
+            for chunk, future in tasks:
+                car_ids, optimality, counters = future.result()
+                self.optimality.extend(optimality)
+                for booking, car_id in zip(chunk, car_ids):
+                    if car_id is None:
+                        self.leftover_trips.append(booking)
+                    else:
+                        booking.car_id = car_id
+                        self.add_reservation(booking, specified_schedule="reshuffled_trips")
+                        
+                # the bookings placed here are already counted by add_reservation
+                counters.pop("bookings_placed", None)
+                self.instrumentation.merge(counters)
+                        
+                        
+    # Reshuffles with a rolling horizon: one window of window_hours at a time, instead of the whole period at once, as bookings are
+    # dispatched day by day. Each window also plans the bookings of the overlap_hours after it, and the cars that are still busy
+    # when a window ends are kept busy in the next one (the carry-over), so no car is given two bookings that overlap.
+    # The engines only ever hold one window, so their memory is bounded by the window size (reshuffle_trip_stream also reads the
+    # trips one window at a time). Each seat group has cars of its own, so its windows are planned apart from the other groups.
+    # workers > 1 reshuffles the seat groups in a process pool, each task with only the cars of its group. A window depends on the
+    # one before it through the carry-over, so a group is only split further where none of its cars is busy at a window boundary:
+    # a continuously loaded group is one chain of windows and one task, and workers beyond the number of seat groups rarely help.
+    # The result is the same as the serial run
+    # With the sweep engine the result is the plan of reshuffle(engine="sweep"), up to the order of bookings with the same start and end,
+    # since the sweep places the bookings by start time and does not need to look ahead
+    # Inputs: the window and overlap lengths in hours, the intended pause between each booking, the engine (first_fit or sweep),
+    # the number of processes and the sort_by and fleet_caps options of reshuffle
+    def reshuffle_rolling(self, window_hours=24, overlap_hours=0, minutes_pause=0, engine="first_fit", workers=None, sort_by="duration", fleet_caps=None):
+        if engine not in ("first_fit", "sweep"):
+            raise ValueError(f"the rolling horizon supports the first_fit and sweep engines, not {engine}")
+        if sort_by not in RESHUFFLE_ORDERS:
+            raise ValueError(f"unknown booking order: {sort_by}")
+        if window_hours * 3600 < 1 or overlap_hours < 0:
+            raise ValueError("the window must be at least a second long and the overlap can not be negative")
+        fleet = self.get_fleet()
+        
+        with self.instrumentation.phase("reshuffle", capture=True):
+            with self.instrumentation.phase("grouping"):
+                # every booking starts from the car it was booked on, so the windows do not depend on an earlier reshuffle
+                reservations = []
+                for car_id, sublist in self.trips.items():
+                    for reservation in sublist:
+                        reservation.car_id = car_id
+                        reservations.append(reservation)
+                reservations.sort(key=lambda reservation: reservation.start)
+                
+                # the windows of each seat group, with a fleet of only the group's cars to send to the worker processes
+                groups = {} # {seats: [reservation]}
+                for reservation in reservations:
+                    groups.setdefault(reservation.seats, []).append(reservation)
+                tasks = []  # [(chains, fleet of the group)]
+                for seats, group in groups.items():
+                    group_fleet = Fleet()
+                    for car in fleet.get_cars_by_seats(seats):
+                        group_fleet.add_car(car.car_id, car)
+                    tasks.extend((batch, group_fleet) for batch in batch_chains(split_rolling_windows(group, window_hours, overlap_hours, minutes_pause),
+                                                                                 parts=-(-(workers or 1) // len(groups))))
+                
+                # initialize the reshuffled schedule
+                self.initialize_reshuffled_trips()
+                self.carry = {}
+                
+            with self.instrumentation.phase("engine"):
+                if workers is not None and workers > 1:
+                    with ProcessPoolExecutor(max_workers=workers) as executor:
+                        futures = [executor.submit(reshuffle_chains, chains, group_fleet, minutes_pause, engine, sort_by, fleet_caps,
+                                                   self.instrumentation.enabled) for chains, group_fleet in tasks]
+                        results = [future.result() for future in futures]
+                else:
+                    results = [reshuffle_chains(chains, group_fleet, minutes_pause, engine, sort_by, fleet_caps, self.instrumentation.enabled)
+                               for chains, group_fleet in tasks]
+                    
+                # place the bookings window by window
+                for (chains, group_fleet), (car_ids, counters) in zip(tasks, results):
+                    bookings = [booking for windows in chains for window in windows for booking in window[2]]
+                    for booking, car_id in zip(bookings, car_ids):
+                        if car_id is None:
+                            self.leftover_trips.append(booking)
+                        else:
+                            booking.car_id = car_id
+                            self.add_reservation(booking, specified_schedule="reshuffled_trips")
+                    self.instrumentation.merge(counters)
+                    
+            if self.instrumentation.enabled:
+                self.instrumentation.count("leftover_bookings", len(self.leftover_trips))
+                
+                
+    # Runs the reshuffle with each engine and reports the number of cars used, leftover bookings and runtime
+    # The schedule keeps the result of the last engine. Inputs: the intended pause between each booking and the engines to compare
+    def compare_reshuffle_engines(self, minutes_pause=0, engines=("first_fit", "sweep", "optimal")):
+        rows = []
+        for engine in engines:
+            start_time = time.perf_counter()
+            self.reshuffle(minutes_pause=minutes_pause, engine=engine)
+            runtime = time.perf_counter() - start_time
+            
+            rows.append({
+                "Engine":            engine,
+                "Cars used":         len(self.reshuffled_trips),
+                "Leftover bookings": len(self.leftover_trips),
+                "Runtime (s)":       runtime,
+            })
+            
+        import pandas as pd
+        return pd.DataFrame(rows).set_index("Engine")
+                    
+                    
+    # Places a new booking into the existing reshuffled schedule without reshuffling everything
+    # The booking goes to the cheapest car that has room for it. If no car has room, a car where the booking only conflicts with
+    # at most max_moves bookings is used, if those bookings can be moved to other cars with the same number of seats.
+    # The booking is also added to the original schedule, under the car it was booked on, so later reshuffles include it
+    # Inputs: the new reservation, the intended pause between each booking and the number of bookings that may be moved
+    # Returns the id of the car the booking was placed on, or None if it was added to the leftover bookings
+    def insert_reservation(self, reservation, minutes_pause=0, max_moves=2):
+        self.add_reservation(reservation, specified_schedule="trips")
+        return self.place_reservation(reservation, minutes_pause=minutes_pause, max_moves=max_moves)
+    
+    
+    # Returns where a booking is in the reshuffled schedule: "reshuffled_trips", "leftover_trips", or None if it has not been
+    # placed yet (it was added to the original schedule after the last reshuffle, or it is not in the schedule at all)
+    def placement_of(self, reservation):
+        if any(booking is reservation for booking in self.reshuffled_trips.get(reservation.car_id, [])):
+            return "reshuffled_trips"
+        if any(booking is reservation for booking in self.leftover_trips):
+            return "leftover_trips"
+        return None
+    
+    
+    # Removes a booking from both schedules (or from the leftover bookings). The freed time is offered to the leftover bookings
+    # with the same number of seats that overlap it. A booking that has not been placed yet is only removed from the original
+    # schedule. Inputs: the reservation and the intended pause between each booking
+    def cancel_reservation(self, reservation, minutes_pause=0):
+        # find the booking before anything is changed. remove_reservation fails if it is not in the original schedule
+        placement = self.placement_of(reservation)
+        self.remove_reservation(reservation, specified_schedule="trips")
+        
+        if placement == "leftover_trips":
+            self.leftover_trips.remove(reservation)
+            return
+        if placement is None:
+            return
+        
+        self.remove_reservation(reservation, specified_schedule="reshuffled_trips")
+        
+        # try to place leftover bookings that wanted the freed time
+        for leftover in list(self.leftover_trips):
+            if (leftover.seats == reservation.seats and leftover.start < reservation.end + minutes_pause * 60 and
+                    leftover.end + minutes_pause * 60 > reservation.start):
+                self.leftover_trips.remove(leftover)
+                self.place_reservation(leftover, minutes_pause=minutes_pause, max_moves=0)
+                
+                
+    # Changes the start and end of a booking. The booking stays on its car if the car still has room for it, and is placed
+    # like a new booking otherwise. A booking that has not been placed yet only gets the new times, and the next reshuffle places it
+    # Inputs: the reservation, the new start and end, the intended pause between each booking and the number of bookings that may
+    # be moved. Returns the id of the car the booking is on, or None if it is a leftover booking or has not been placed yet
+    def modify_reservation(self, reservation, start_ts, ends_ts, minutes_pause=0, max_moves=2):
+        fleet = self.get_fleet()
+        start = to_epoch_seconds(start_ts)
+        end   = to_epoch_seconds(ends_ts)
+        
+        # find the booking before anything is changed
+        placement = self.placement_of(reservation)
+        if placement is None and not any(booking is reservation for bookings in self.trips.values() for booking in bookings):
+            raise ValueError(f"reservation {reservation.trip_id} is not in the schedule")
+        
+        if placement == "leftover_trips":
+            self.leftover_trips.remove(reservation)
+        elif placement == "reshuffled_trips":
+            self.remove_reservation(reservation, specified_schedule="reshuffled_trips")
+            
+        # the original schedule holds the same object, so it sees the new times as well
+        reservation.start = start
+        reservation.end   = end
+        # and the tables of a loaded snapshot hold the old times
+        self.tables.clear()
+        
+        if placement is None:
+            return None
+        
+        # keep the booking on its car if possible
+        if reservation.car_id in fleet.cars and self.can_accommodate_reservation(reservation, fleet.cars[reservation.car_id], minutes_pause=minutes_pause):
+            self.add_reservation(reservation, specified_schedule="reshuffled_trips")
+            return reservation.car_id
+        
+        return self.place_reservation(reservation, minutes_pause=minutes_pause, max_moves=max_moves)
+    
+    
+    # Places a booking in the reshuffled schedule, moving at most max_moves conflicting bookings to other cars if no car has room
+    # Inputs: the reservation, the intended pause between each booking and the number of bookings that may be moved
+    # Returns the id of the car the booking was placed on, or None if it was added to the leftover bookings
+    def place_reservation(self, reservation, minutes_pause=0, max_moves=2):
+        fleet = self.get_fleet()
+        
+        applicable_cars = fleet.get_cars_by_seats(reservation.seats, sort_by="category_id") # sort the cars by cheapest first
+        
+        # the cheapest car with room for the booking
+        for car in applicable_cars:
+            if self.can_accommodate_reservation(reservation, car, minutes_pause=minutes_pause):
+                reservation.car_id = car.car_id
+                self.add_reservation(reservation, specified_schedule="reshuffled_trips")
+                return car.car_id
+            
+        # local repair: make room on a car by moving the few bookings that are in the way
+        pause = minutes_pause * 60
+        for car in applicable_cars:
+            # a booking carried over from before the schedule's period can not be moved
+            if self.carry.get(car.car_id, float("-inf")) > reservation.start - pause:
+                continue
+            index     = self.reshuffled_index.get(car.car_id)
+            conflicts = index.conflicts(reservation.start - pause, reservation.end + pause) if index is not None else []
+            if len(conflicts) > max_moves:
+                continue
+            
+            # put the new booking on the car instead of the conflicting ones
+            for booking in conflicts:
+                self.remove_reservation(booking, specified_schedule="reshuffled_trips")
+            reservation.car_id = car.car_id
+            self.add_reservation(reservation, specified_schedule="reshuffled_trips")
+            
+            # move each conflicting booking to the first other car with room for it
+            moved = []
+            for booking in conflicts:
+                for other_car in applicable_cars:
+                    if self.can_accommodate_reservation(booking, other_car, minutes_pause=minutes_pause):
+                        booking.car_id = other_car.car_id
+                        self.add_reservation(booking, specified_schedule="reshuffled_trips")
+                        moved.append(booking)
+                        break
+                    
+            if len(moved) == len(conflicts):
+                return car.car_id
+            
+            # undo the moves and try the next car
+            for booking in moved:
+                self.remove_reservation(booking, specified_schedule="reshuffled_trips")
+            self.remove_reservation(reservation, specified_schedule="reshuffled_trips")
+            for booking in conflicts:
+                booking.car_id = car.car_id
+                self.add_reservation(booking, specified_schedule="reshuffled_trips")
+                
+        # handle leftover bookings
+        self.leftover_trips.append(reservation)
+        return None
+    
+    
+    # Saves the original schedule, the reshuffled schedule and the leftover bookings to a directory of .npy files:
+    #   trips/, reshuffled_trips/  one ReservationTable each, with the car each booking is scheduled on
+    #   reshuffled_rows.npy        the row in trips/ of each booking in reshuffled_trips/
+    #   leftover_rows.npy          the row in trips/ of each leftover booking, and leftover_car_id.npy their reservation.car_id
+    #   schedule.json              the start and end of the period
+    # Input: the directory
+    def save(self, path):
+        reservations = [reservation for sublist in self.trips.values() for reservation in sublist]
+        row_of       = {id(reservation): i for i, reservation in enumerate(reservations)}
+        
+        # every booking of the reshuffled schedule and every leftover booking is also in the original schedule
+        try:
+            reshuffled_rows = [row_of[id(reservation)] for sublist in self.reshuffled_trips.values() for reservation in sublist]
+            leftover_rows   = [row_of[id(reservation)] for reservation in self.leftover_trips]
+        except KeyError:
+            raise ValueError("the reshuffled schedule has bookings that are not in the original schedule") from None
+        
+        self.to_table("trips").save(os.path.join(path, "trips"))
+        self.to_table("reshuffled_trips").save(os.path.join(path, "reshuffled_trips"))
+        np.save(os.path.join(path, "reshuffled_rows.npy"), np.array(reshuffled_rows, dtype=np.int64))
+        np.save(os.path.join(path, "leftover_rows.npy"),   np.array(leftover_rows, dtype=np.int64))
+        np.save(os.path.join(path, "leftover_car_id.npy"), np.array([reservation.car_id for reservation in self.leftover_trips], dtype=np.int64))
+        
+        with open(os.path.join(path, "schedule.json"), "w") as file:
+            json.dump({"earliestStart": None if self.earliestStart is None else str(self.earliestStart),
+                       "latestEnd":     None if self.latestEnd is None else str(self.latestEnd)}, file)
+            
+            
+    # Loads a schedule saved by save. The arrays are memory-mapped (with mmap_mode="r"), and the reports use them directly
+    # until the schedule changes. The Reservation objects are only created the first time they are used (by materialize),
+    # so loading a snapshot to report on it does not create any. A booking in both schedules is one Reservation object,
+    # as in the schedule that was saved. Inputs: the directory, the mmap_mode of np.load and the fleet to reshuffle and place bookings with
+    @classmethod
+    def load(cls, path, mmap_mode="r", fleet=None):
+        with open(os.path.join(path, "schedule.json")) as file:
+            period = json.load(file)
+        schedule = cls(None if period["earliestStart"] is None else datetime.fromisoformat(period["earliestStart"]),
+                       None if period["latestEnd"] is None else datetime.fromisoformat(period["latestEnd"]), fleet=fleet)
+        
+        trips      = ReservationTable.load(os.path.join(path, "trips"), mmap_mode=mmap_mode)
+        reshuffled = ReservationTable.load(os.path.join(path, "reshuffled_trips"), mmap_mode=mmap_mode)
+        
+        schedule.tables   = {"trips": trips, "reshuffled_trips": reshuffled}
+        schedule.snapshot = (trips, reshuffled,
+                             np.load(os.path.join(path, "reshuffled_rows.npy"), mmap_mode=mmap_mode),
+                             np.load(os.path.join(path, "leftover_rows.npy"), mmap_mode=mmap_mode),
+                             np.load(os.path.join(path, "leftover_car_id.npy"), mmap_mode=mmap_mode))
+        return schedule
+    
+    
+    # Creates the Reservation objects of a loaded snapshot. Called by the first use of trips, reshuffled_trips, reshuffled_index
+    # or leftover_trips. The tables of the snapshot are kept, since the schedule has not changed yet
+    def materialize(self):
+        trips, reshuffled, reshuffled_rows, leftover_rows, leftover_car_ids = self.snapshot
+        self.snapshot = None
+        
+        tables, timeline = self.tables, self.timeline
+        self.tables, self.timeline = {}, None
+        self.trips = {}
+        self.initialize_reshuffled_trips()
+        
+        # the original schedule, with each booking on its original car
+        reservations = trips.to_reservations()
+        for reservation in reservations:
+            self.add_reservation(reservation, specified_schedule="trips")
+            
+        # the reshuffled schedule and the leftover bookings move the same objects to their new cars
+        for row, car_id in zip(reshuffled_rows.tolist(), reshuffled.car_id.tolist()):
+            reservation = reservations[row]
+            reservation.car_id = car_id
+            self.add_reservation(reservation, specified_schedule="reshuffled_trips")
+            
+        for row, car_id in zip(leftover_rows.tolist(), leftover_car_ids.tolist()):
+            reservation = reservations[row]
+            reservation.car_id = car_id
+            self.leftover_trips.append(reservation)
+            
+        self.tables, self.timeline = tables, timeline
+        
+        
+    # Returns the number of leftover bookings, without creating the Reservation objects of a loaded snapshot
+    def count_leftover_trips(self):
+        if self.snapshot is not None:
+            return len(self.snapshot[3])
+        return len(self.leftover_trips)
+    
+    
+    # Provides a report of key metrics to evaluate the effectiveness of reshuffling method. Input: the specified schedule
+    # Utilization is given as a number in percent
+    def report(self, specified_schedule="trips"):
+        # calculate the metrics of all cars at once
+        with self.instrumentation.phase("report"):
+            statsDF = calculate_fleet_metrics(self.to_table(specified_schedule), self.earliestStart, self.latestEnd)
+
+        # Rounding all numeric columns to two decimals
+        statsDF = statsDF.round(2)
+
+        # Sorting by 'Productive time' in descending order
+        statsDF = statsDF.sort_values(by='Productive time', ascending=False)
+        statsDF.set_index("Car ID", inplace=True)
+        
+        return statsDF
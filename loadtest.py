@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Load test of the availability service: many clients send availability lookups and bookings at the same time, and the
+# latency of every request is measured from sending the line to receiving its response
+#
+#   python loadtest.py                                       # starts the service in this process on synthetic data
+#   python loadtest.py --clients 100 --requests 20000 --book-share 0.1
+#   python loadtest.py --connect 127.0.0.1:8765 --seats 5 7  # runs against a service started with service.py
+#
+# With the in-process service, the reshuffled schedule is checked afterwards for cars that got two overlapping bookings
+
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+import exam
+from benchmark import generate_fleet, generate_trips
+from service import AvailabilityService
+
+
+# Creates the requests: lookups and bookings for random windows in the period, with durations like the synthetic trips
+# Inputs: the number of requests, the share of bookings, the numbers of seats, the period in seconds since epoch and a random seed
+def generate_requests(number_of_requests, book_share, seats, first_start, last_start, seed=0):
+    rng       = np.random.default_rng(seed)
+    starts    = rng.integers(first_start, last_start, number_of_requests) // 60 * 60
+    durations = np.maximum(rng.gamma(2, 1.5, number_of_requests) * 3600 // 60 * 60, 60).astype(np.int64)
+    books     = rng.random(number_of_requests) < book_share
+    seat_list = rng.choice(seats, number_of_requests)
+
+    requests = []
+    for i in range(number_of_requests):
+        request = {"id": i, "op": "book" if books[i] else "available", "seats": int(seat_list[i]),
+                   "start": int(starts[i]), "end": int(starts[i] + durations[i])}
+        if books[i]:
+            request["trip_id"] = 10**9 + i
+        else:
+            request["limit"] = 5
+        requests.append(request)
+
+    return requests
+
+
+# One client: sends its requests one after the other on its own connection and records (op, latency in seconds)
+async def run_client(host, port, requests):
+    reader, writer = await asyncio.open_connection(host, port)
+    latencies = []
+    try:
+        for request in requests:
+            start_time = time.perf_counter()
+            writer.write((json.dumps(request) + "\n").encode())
+            await writer.drain()
+            response = json.loads(await reader.readline())
+            latencies.append((request["op"], time.perf_counter() - start_time, response.get("ok", False)))
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+    return latencies
+
+
+# Runs the clients at the same time and returns all latencies and the wall time
+async def run_load(host, port, requests, clients):
+    start_time = time.perf_counter()
+    results    = await asyncio.gather(*(run_client(host, port, requests[i::clients]) for i in range(clients)))
+    return [latency for result in results for latency in result], time.perf_counter() - start_time
+
+
+# Returns a dataframe with the number of requests, errors and p50/p99 latency in milliseconds per operation and in total
+def summarize(latencies):
+    table = pd.DataFrame(latencies, columns=["op", "latency", "ok"])
+    rows  = []
+    for op, group in list(table.groupby("op")) + [("all", table)]:
+        rows.append({"op": op, "requests": len(group), "errors": int((~group["ok"]).sum()),
+                     "p50 (ms)": group["latency"].quantile(0.50) * 1000,
+                     "p99 (ms)": group["latency"].quantile(0.99) * 1000,
+                     "max (ms)": group["latency"].max() * 1000})
+    return pd.DataFrame(rows).set_index("op")
+
+
+# Returns the number of pairs of consecutive bookings on the same car that overlap, counting the pause
+def count_double_assignments(schedule, minutes_pause):
+    double = 0
+    for index in schedule.reshuffled_index.values():
+        ends   = np.array(index.ends, dtype=np.int64)
+        starts = np.array(index.starts, dtype=np.int64)
+        double += int(np.sum(ends[:-1] + minutes_pause * 60 > starts[1:]))
+    return double
+
+
+# Starts the service on synthetic data in this process and runs the load test against it
+async def run_in_process(args):
+    car_raw, model_raw, car_category_raw = generate_fleet(args.cars, seed=args.seed)
+    trips_raw = generate_trips(args.trips, car_raw, seed=args.seed)
+
+    car_table = exam.build_car_table(car_raw, model_raw, car_category_raw)
+    schedule  = exam.Schedule(trips_raw['start_ts'].min(), trips_raw['ends_ts'].max(), fleet=exam.load_fleet(car_table))
+    for reservation in exam.load_reservations(trips_raw, car_table):
+        schedule.add_reservation(reservation)
+    schedule.reshuffle(minutes_pause=args.minutes_pause, engine="sweep")
+
+    service = AvailabilityService(schedule, minutes_pause=args.minutes_pause, max_batch=args.max_batch, max_delay_ms=args.max_delay_ms)
+    server, writer_task = await service.start("127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    seats    = sorted(car_table['seats'].dropna().astype(int).unique())
+    requests = generate_requests(args.requests, args.book_share, seats, exam.to_epoch_seconds(schedule.earliestStart),
+                                 exam.to_epoch_seconds(schedule.latestEnd), args.seed)
+    async with server:
+        latencies, wall_time = await run_load("127.0.0.1", port, requests, args.clients)
+    writer_task.cancel()
+
+    print(f"mean batch size: {np.mean(service.batch_sizes):.1f} requests")
+    print(f"double assignments: {count_double_assignments(schedule, args.minutes_pause)}")
+    return latencies, wall_time
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the availability service and report p50/p99 latency")
+    parser.add_argument("--connect", help="host:port of a running service (default: start one in this process on synthetic data)")
+    parser.add_argument("--clients", type=int, default=50, help="concurrent connections")
+    parser.add_argument("--requests", type=int, default=10_000, help="total number of requests")
+    parser.add_argument("--book-share", type=float, default=0.2, help="share of the requests that are bookings")
+    parser.add_argument("--minutes-pause", type=int, default=30)
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-delay-ms", type=float, default=1)
+    parser.add_argument("--cars", type=int, default=300, help="fleet size of the synthetic data")
+    parser.add_argument("--trips", type=int, default=20_000, help="number of synthetic trips")
+    parser.add_argument("--seats", type=int, nargs="+", default=[5], help="numbers of seats to ask for with --connect")
+    parser.add_argument("--start", default="2023-01-01", help="first day of the requests with --connect")
+    parser.add_argument("--days", type=int, default=30, help="number of days of the requests with --connect")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.connect:
+        host, port = args.connect.rsplit(":", 1)
+        first_start = pd.Timestamp(args.start, tz="UTC").value // 10**9
+        requests = generate_requests(args.requests, args.book_share, args.seats, first_start, first_start + args.days * 86400, args.seed)
+        latencies, wall_time = asyncio.run(run_load(host, int(port), requests, args.clients))
+    else:
+        latencies, wall_time = asyncio.run(run_in_process(args))
+
+    print(summarize(latencies).round(3))
+    print(f"throughput: {len(latencies) / wall_time:.0f} requests/s")
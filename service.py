@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# A local availability service over a reshuffled Schedule. Clients send one JSON request per line over TCP and get one JSON
+# response per line back, with the "id" of the request:
+#
+#   {"id": 1, "op": "available", "seats": 5, "start": "2023-03-01T16:00Z", "end": "2023-03-01T18:00Z", "limit": 3}
+#   -> {"id": 1, "ok": true, "cars": [101, 102, 107]}
+#   {"id": 2, "op": "book", "trip_id": 99000001, "seats": 5, "start": "2023-03-01T16:00Z", "end": "2023-03-01T18:00Z"}
+#   -> {"id": 2, "ok": true, "car_id": 101}                  (car_id is null when the booking is a leftover)
+#
+#   python service.py --port 8765 --minutes-pause 30       # serves the trips in data/, reshuffled with the sweep engine
+#
+# Requests that arrive together are evaluated as one batch by a single writer task. Only that task reads or changes the schedule,
+# and it does not yield to the event loop inside a batch, so two concurrent bookings can never be given the same car
+
+import argparse
+import asyncio
+import json
+
+import exam
+
+
+class AvailabilityService:
+    def __init__(self, schedule, minutes_pause=30, max_batch=256, max_delay_ms=1, max_moves=2):
+        self.schedule      = schedule
+        self.minutes_pause = minutes_pause
+        self.max_batch     = max_batch
+        self.max_delay     = max_delay_ms / 1000 # how long the writer waits for more requests before it evaluates a batch
+        self.max_moves     = max_moves
+        self.queue         = None                # (request, future), created on the service's event loop
+        self.batch_sizes   = []
+
+    # Queues a request for the writer task and returns its response
+    async def submit(self, request):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((request, future))
+        return await future
+
+    # The single writer: takes the waiting requests (at most max_batch, waiting at most max_delay for more) and evaluates them
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                if self.queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(self.queue.get_nowait())
+
+            self.batch_sizes.append(len(batch))
+            try:
+                responses = self.evaluate(batch)
+            except Exception as error:
+                # the writer must keep running for the other clients, so the batch fails instead
+                for request, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+
+            for (request, future), response in zip(batch, responses):
+                if not future.done():
+                    future.set_result(response)
+
+    # Evaluates a batch in arrival order, without yielding. Runs of availability lookups between two bookings are answered
+    # together, with one pass over the interval index of each car. Inputs: a list of (request, future). Returns the responses
+    # A request that fails only fails its own response
+    def evaluate(self, batch):
+        responses = [None] * len(batch)
+        lookups   = [] # (position in the batch, request) of the current run of lookups
+
+        for i, (request, _) in enumerate(batch):
+            try:
+                if not isinstance(request, dict):
+                    responses[i] = {"ok": False, "error": "a request must be a JSON object"}
+                elif request.get("op") == "available":
+                    lookups.append((i, request))
+                elif request.get("op") == "book":
+                    self.answer_all_lookups(lookups, responses)
+                    lookups = []
+                    responses[i] = self.book(request)
+                else:
+                    responses[i] = {"ok": False, "error": f"unknown op: {request.get('op')}"}
+            except (KeyError, ValueError, TypeError) as error:
+                responses[i] = {"ok": False, "error": f"bad request: {error!r}"}
+            except Exception as error:
+                responses[i] = {"ok": False, "error": f"internal error: {error!r}"}
+
+        self.answer_all_lookups(lookups, responses)
+        return responses
+
+    # Answers a run of availability lookups. If that fails, the lookups that have no response yet get the error
+    def answer_all_lookups(self, lookups, responses):
+        try:
+            self.answer_lookups(lookups, responses)
+        except Exception as error:
+            for i, request in lookups:
+                if responses[i] is None:
+                    responses[i] = {"ok": False, "error": f"internal error: {error!r}"}
+
+    # Answers availability lookups: the cars with the number of seats (cheapest first) that have room for the window,
+    # leaving out cars that are still busy with a booking carried over from before the schedule's period (Schedule.carry)
+    # Inputs: the lookups as (position in the batch, request) and the list of responses to fill in
+    def answer_lookups(self, lookups, responses):
+        pause = self.minutes_pause * 60
+
+        by_seats = {} # {seats: [(position, adjusted start, adjusted end, limit, free cars)]}
+        for i, request in lookups:
+            try:
+                start = exam.to_epoch_seconds(request["start"]) - pause
+                end   = exam.to_epoch_seconds(request["end"]) + pause
+                limit = request.get("limit")
+                if limit is not None:
+                    limit = int(limit)
+                    if limit < 0:
+                        raise ValueError("the limit can not be negative")
+                by_seats.setdefault(int(request["seats"]), []).append((i, start, end, limit, []))
+            except (KeyError, ValueError, TypeError) as error:
+                responses[i] = {"ok": False, "error": f"bad request: {error!r}"}
+
+        for seats, queries in by_seats.items():
+            for car in self.schedule.fleet.get_cars_by_seats(seats, sort_by="category_id"):
+                index = self.schedule.reshuffled_index.get(car.car_id)
+                busy  = self.schedule.carry.get(car.car_id) # busy until then with a booking from before the schedule's period
+                for i, start, end, limit, free in queries:
+                    if limit is not None and len(free) >= limit:
+                        continue
+                    if busy is not None and busy > start:
+                        continue
+                    if index is None or not index.overlaps(start, end):
+                        free.append(car.car_id)
+
+            for i, start, end, limit, free in queries:
+                responses[i] = {"ok": True, "cars": free}
+
+    # Inserts a booking into the schedule. The booking is recorded on the cheapest car with the number of seats (or on car_id
+    # if given) in the original schedule, and placed by Schedule.insert_reservation in the reshuffled one
+    # The whole request is checked before the schedule is changed, and a booking that fails is taken out of the schedule again
+    def book(self, request):
+        trip_id   = int(request["trip_id"])
+        seats     = int(request["seats"])
+        driven_km = float(request.get("driven_km", 0))
+        start     = exam.to_epoch_seconds(request["start"])
+        end       = exam.to_epoch_seconds(request["end"])
+        if end < start:
+            return {"ok": False, "error": "the booking ends before it starts"}
+
+        fleet = self.schedule.fleet
+        cars  = fleet.get_cars_by_seats(seats, sort_by="category_id")
+        if not cars:
+            return {"ok": False, "error": f"no cars with {seats} seats"}
+
+        if "car_id" in request:
+            car = fleet.cars.get(int(request["car_id"]))
+            if car is None or car.seats != seats:
+                return {"ok": False, "error": f"no car {request['car_id']} with {seats} seats"}
+        else:
+            car = cars[0]
+
+        reservation = exam.Reservation(trip_id, driven_km, start, end, car.car_id, seats, car.category_id, car.category_name)
+        try:
+            car_id = self.schedule.insert_reservation(reservation, minutes_pause=self.minutes_pause, max_moves=self.max_moves)
+        except Exception:
+            if reservation in self.schedule.leftover_trips:
+                self.schedule.leftover_trips.remove(reservation)
+            elif reservation.car_id in self.schedule.reshuffled_trips and reservation in self.schedule.reshuffled_trips[reservation.car_id]:
+                self.schedule.remove_reservation(reservation, specified_schedule="reshuffled_trips")
+            self.schedule.remove_reservation(reservation, specified_schedule="trips")
+            raise
+        return {"ok": True, "car_id": car_id}
+
+    # Serves one connection: every line is a request, answered as soon as its batch has been evaluated
+    async def handle_connection(self, reader, writer):
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                task = asyncio.create_task(self.answer_line(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(tasks)
+        finally:
+            writer.close()
+
+    async def answer_line(self, line, writer):
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as error:
+            request, response = {}, {"ok": False, "error": f"invalid JSON: {error}"}
+        else:
+            if not isinstance(request, dict):
+                request, response = {}, {"ok": False, "error": "a request must be a JSON object"}
+            else:
+                try:
+                    response = await self.submit(request)
+                except Exception as error:
+                    response = {"ok": False, "error": f"internal error: {error!r}"}
+
+        if "id" in request:
+            response = {"id": request["id"], **response}
+        writer.write((json.dumps(response) + "\n").encode())
+        await writer.drain()
+
+    # Starts the writer task and the TCP server. Returns the server and the writer task
+    async def start(self, host="127.0.0.1", port=8765):
+        self.queue  = asyncio.Queue()
+        writer_task = asyncio.create_task(self.run())
+        server      = await asyncio.start_server(self.handle_connection, host, port)
+        return server, writer_task
+
+
+# Reads the data files into a schedule with its fleet and reshuffles it
+# Inputs: the data directory, the intended pause between each booking and the reshuffle engine. Returns the schedule
+def load_schedule(data="data", minutes_pause=30, engine="sweep"):
+    schedule = exam.Dataset(data).schedule()
+    schedule.reshuffle(minutes_pause=minutes_pause, engine=engine)
+    return schedule
+
+
+async def serve(schedule, host, port, **options):
+    service = AvailabilityService(schedule, **options)
+    server, writer_task = await service.start(host, port)
+    print(f"serving on {host}:{port}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve availability lookups and bookings over a reshuffled schedule")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--data", default="data", help="directory with car.csv, model.csv, car_category.csv and trips.csv")
+    parser.add_argument("--minutes-pause", type=int, default=30)
+    parser.add_argument("--engine", default="sweep", choices=["first_fit", "sweep", "optimal"])
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-delay-ms", type=float, default=1)
+    args = parser.parse_args()
+
+    schedule = load_schedule(args.data, args.minutes_pause, args.engine)
+    asyncio.run(serve(schedule, args.host, args.port, minutes_pause=args.minutes_pause, max_batch=args.max_batch, max_delay_ms=args.max_delay_ms))
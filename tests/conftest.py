@@ -0,0 +1,42 @@
+# Shared test setup: the package is imported from the repository, also when pytest is run from another directory, and the
+# fixtures make a small synthetic fleet and trips with the generators of benchmark.py
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import benchmark
+import exam
+
+
+# the merged car table and the trips of a fleet of 60 cars. generate_fleet reads the models from data/, relative to the repository
+@pytest.fixture(scope="session")
+def synthetic():
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    try:
+        car_raw, model_raw, car_category_raw = benchmark.generate_fleet(60, seed=1)
+    finally:
+        os.chdir(cwd)
+
+    car_table = exam.build_car_table(car_raw, model_raw, car_category_raw)
+    trips_raw = benchmark.generate_trips(1500, car_raw, arrivals_per_hour=3, mean_duration_hours=3, seed=1)
+    return car_table, trips_raw
+
+
+# Builds a fresh schedule of the synthetic trips, since reshuffling changes the reservations
+@pytest.fixture
+def make_schedule(synthetic):
+    car_table, trips_raw = synthetic
+
+    def make():
+        schedule = exam.Schedule(trips_raw['start_ts'].min(), trips_raw['ends_ts'].max(), fleet=exam.load_fleet(car_table))
+        for reservation in exam.load_reservations(trips_raw, car_table):
+            schedule.add_reservation(reservation)
+        return schedule
+
+    return make
@@ -0,0 +1,34 @@
+# Reshuffling a trips file window by window against the rolling horizon of the schedule
+
+import numpy as np
+import pytest
+
+from exam import reshuffle_trip_stream
+
+
+@pytest.mark.parametrize("engine", ["first_fit", "sweep"])
+@pytest.mark.parametrize("overlap_hours", [0, 4])
+def test_trip_stream_matches_rolling_horizon(synthetic, make_schedule, tmp_path, engine, overlap_hours):
+    car_table, trips_raw = synthetic
+    path = tmp_path / "trips.csv"
+    trips_raw.to_csv(path, sep=";", index=False)
+
+    windows = reshuffle_trip_stream(path, car_table, window_hours=24, overlap_hours=overlap_hours, minutes_pause=30, engine=engine, chunksize=500)
+
+    schedule = make_schedule()
+    schedule.reshuffle_rolling(window_hours=24, overlap_hours=overlap_hours, minutes_pause=30, engine=engine)
+    placed = [(booking, car_id) for car_id, bookings in schedule.reshuffled_trips.items() for booking in bookings]
+
+    assert windows["Number of reservations"].sum() == len(trips_raw)
+    assert windows["Leftover bookings"].sum() == len(schedule.leftover_trips)
+    for window_start, row in windows.iterrows():
+        start = int(window_start.timestamp())
+        end   = start + 24 * 3600
+        # the cars of the bookings that start in the window, and the cars that are still busy from the windows before it
+        cars = {car_id for booking, car_id in placed if start <= booking.start < end}
+        busy = {car_id for booking, car_id in placed if booking.start < start and booking.end + 30 * 60 > start}
+        assert row["Cars used after"] == len(cars)
+        assert row["Cars busy at the start"] == len(busy)
+
+    # bookings run past midnight, so some windows start with busy cars
+    assert windows["Cars busy at the start"].iloc[1:].gt(0).any()
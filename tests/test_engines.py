@@ -0,0 +1,37 @@
+# The min-cost flow of the optimal engine against all subsets of a few bookings
+
+import itertools
+
+import numpy as np
+import pytest
+
+from exam import max_overlapping, max_served_bookings
+
+
+# the subsets of the bookings that fit on the cars, as boolean arrays
+def fitting_subsets(starts, ends, number_of_cars, pause):
+    for keep in itertools.product([False, True], repeat=len(starts)):
+        keep = np.array(keep)
+        if not keep.any() or max_overlapping(starts[keep], ends[keep], pause) <= number_of_cars:
+            yield keep
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_max_served_bookings_is_optimal_and_prefers_earlier_bookings(seed):
+    rng = np.random.default_rng(seed)
+
+    for _ in range(50):
+        n      = int(rng.integers(2, 9))
+        cars   = int(rng.integers(1, 3))
+        pause  = int(rng.integers(0, 3))
+        starts = np.sort(rng.integers(0, 20, n))
+        ends   = starts + rng.integers(0, 8, n)
+
+        chosen, status = max_served_bookings(starts, ends, cars, pause)
+        assert max_overlapping(starts[chosen], ends[chosen], pause) <= cars
+
+        # the most bookings, and among those the earliest ones, by the tie-breaking weights of the solver
+        weights = 1 + np.arange(n, 0, -1) / (2 * n * n)
+        best    = max(weights[keep].sum() for keep in fitting_subsets(starts, ends, cars, pause))
+        assert chosen.sum() == int(best)
+        assert weights[chosen].sum() == pytest.approx(best, abs=1e-12)
@@ -0,0 +1,54 @@
+# The interval index of each car against the overlap rule of the original linear scan
+
+import numpy as np
+import pytest
+
+from exam import IntervalIndex
+
+
+# the overlap rule of the original linear scan in can_accommodate_reservation
+def overlaps_linear(bookings, start, end):
+    return [(s, e) for s, e in bookings if (start > s) and (start < e) or (end > s) and (end < e) or (start <= s) and (end >= e)]
+
+
+# random bookings of one car, accepted one at a time by the linear rule like the reshuffle does, including zero-length ones
+def accepted_bookings(rng, n=300):
+    bookings = []
+    index    = IntervalIndex()
+    for _ in range(n):
+        start = int(rng.integers(0, 2000))
+        end   = start + int(rng.choice([0, rng.integers(1, 40)]))
+        if not overlaps_linear(bookings, start, end):
+            booking = (start, end)
+            bookings.append(booking)
+            index.insert(start, end, booking)
+    return bookings, index
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_interval_index_matches_linear_rule(seed):
+    rng = np.random.default_rng(seed)
+    bookings, index = accepted_bookings(rng)
+
+    for _ in range(2000):
+        start = int(rng.integers(-50, 2050))
+        end   = start + int(rng.integers(0, 60))
+        expected = overlaps_linear(bookings, start, end)
+        assert index.overlaps(start, end) == bool(expected)
+        assert sorted(index.conflicts(start, end)) == sorted(expected)
+
+
+def test_interval_index_remove():
+    rng = np.random.default_rng(7)
+    bookings, index = accepted_bookings(rng)
+
+    for booking in bookings[::2]:
+        index.remove(*booking, booking)
+    kept = bookings[1::2]
+    assert len(index) == len(kept)
+    assert index.starts == sorted(index.starts)
+
+    for _ in range(1000):
+        start = int(rng.integers(-50, 2050))
+        end   = start + int(rng.integers(0, 60))
+        assert index.overlaps(start, end) == bool(overlaps_linear(kept, start, end))
@@ -0,0 +1,26 @@
+# calculate_fleet_metrics against the per-car calculate_* methods of the schedule
+
+import pytest
+
+from exam import calculate_fleet_metrics
+
+
+@pytest.mark.parametrize("specified_schedule", ["trips", "reshuffled_trips"])
+def test_fleet_metrics_match_per_car_methods(make_schedule, specified_schedule):
+    schedule = make_schedule()
+    schedule.reshuffle(minutes_pause=30, engine="sweep")
+    bookings = schedule.trips if specified_schedule == "trips" else schedule.reshuffled_trips
+
+    metrics = calculate_fleet_metrics(schedule.to_table(specified_schedule), schedule.earliestStart, schedule.latestEnd).set_index("Car ID")
+    assert sorted(metrics.index) == sorted(bookings)
+
+    for car_id in bookings:
+        car = schedule.fleet.cars[car_id]
+        row = metrics.loc[car_id]
+        # calculate_idle_time sorts the car's bookings by start, which the other methods expect
+        assert row["Idle time"]              == pytest.approx(schedule.calculate_idle_time(car, specified_schedule))
+        assert row["Number of reservations"] == len(bookings[car_id])
+        assert row["Productive time"]        == pytest.approx(schedule.calculate_productive_time(car, specified_schedule))
+        assert row["Unusable time"]          == pytest.approx(schedule.calculate_unusable_time(car, specified_schedule))
+        assert row["Wasted time"]            == pytest.approx(schedule.calculate_wasted_time(car, specified_schedule))
+        assert row["Utilization"]            == pytest.approx(schedule.calculate_utilization(car, specified_schedule) * 100)
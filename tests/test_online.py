@@ -0,0 +1,176 @@
+# The online changes to a reshuffled schedule: insert, cancel and modify, and the local repair of place_reservation
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+import exam
+
+
+def hour(h):
+    return datetime(2023, 1, 1, tzinfo=timezone.utc) + timedelta(hours=h)
+
+
+# a schedule over cars with 5 seats of the same category, so they are tried in the order of their ids
+def small_schedule(number_of_cars):
+    fleet = exam.Fleet()
+    for car_id in range(1, number_of_cars + 1):
+        car = exam.Car(car_id, 1, 1, car_id, "")
+        car.set_model("model", 5, 1, "category")
+        fleet.add_car(car_id, car)
+    return exam.Schedule(hour(0), hour(24), fleet=fleet)
+
+
+# adds a booking to both schedules on the same car, as a reshuffle would have placed it
+def placed(schedule, trip_id, start, end, car_id):
+    reservation = exam.Reservation(trip_id, 0, hour(start), hour(end), car_id, fleet=schedule.fleet)
+    schedule.add_reservation(reservation)
+    schedule.add_reservation(reservation, specified_schedule="reshuffled_trips")
+    return reservation
+
+
+# the plan as {car_id: set of trip ids}, the car_id of each booking and the intervals of each car's index
+def plan(schedule):
+    return ({car_id: {booking.trip_id for booking in bookings} for car_id, bookings in schedule.reshuffled_trips.items()},
+            {booking.trip_id: booking.car_id for bookings in schedule.trips.values() for booking in bookings},
+            {car_id: list(zip(index.starts, index.ends)) for car_id, index in schedule.reshuffled_index.items()},
+            [booking.trip_id for booking in schedule.leftover_trips])
+
+
+# the invariants of the online changes: no car has bookings closer than the pause, each interval index holds exactly the bookings
+# of its car, and every booking of the original schedule is placed once, a leftover, or one of the bookings not placed yet
+def assert_consistent(schedule, minutes_pause, unplaced=()):
+    assert set(schedule.reshuffled_index) == set(schedule.reshuffled_trips)
+    for car_id, bookings in schedule.reshuffled_trips.items():
+        index = schedule.reshuffled_index[car_id]
+        assert sorted(map(id, index.items)) == sorted(map(id, bookings))
+        assert index.starts == sorted(index.starts)
+        assert all((booking.start, booking.end) == (start, end) for booking, start, end in zip(index.items, index.starts, index.ends))
+        assert all(booking.car_id == car_id and booking.seats == schedule.fleet.cars[car_id].seats for booking in bookings)
+
+        bookings = sorted(bookings, key=lambda booking: (booking.start, booking.end))
+        assert all(later.start >= earlier.end + minutes_pause * 60 for earlier, later in zip(bookings, bookings[1:]))
+
+    original   = sorted(id(booking) for bookings in schedule.trips.values() for booking in bookings)
+    reshuffled = [id(booking) for bookings in schedule.reshuffled_trips.values() for booking in bookings]
+    leftover   = [id(booking) for booking in schedule.leftover_trips]
+    assert sorted(reshuffled + leftover + [id(booking) for booking in unplaced]) == original
+
+
+# random inserts, cancels and modifies on a busy part of the synthetic schedule, with and without a pause
+@pytest.mark.parametrize("minutes_pause, seed", [(0, 0), (30, 1), (30, 2)])
+def test_random_online_changes_keep_the_schedule_consistent(make_schedule, minutes_pause, seed):
+    rng      = np.random.default_rng(seed)
+    schedule = make_schedule()
+    schedule.reshuffle(minutes_pause=minutes_pause, engine="sweep")
+    seats    = sorted({car.seats for car in schedule.fleet.cars.values()})
+    first    = min(booking.start for bookings in schedule.trips.values() for booking in bookings)
+    unplaced = []
+    repairs  = 0
+
+    for trip_id in range(10_000, 10_400):
+        bookings = [booking for sublist in schedule.trips.values() for booking in sublist]
+        action   = rng.choice(["insert", "insert", "insert", "cancel", "modify", "add"])
+        # the new bookings all fall in two days, so the cars fill up and the repair has to move bookings
+        start    = first + int(rng.integers(0, 48 * 60)) * 60
+        end      = start + int(rng.integers(0, 6 * 60)) * 60
+
+        if action in ("insert", "add"):
+            x           = int(rng.choice(seats))
+            car         = schedule.fleet.get_cars_by_seats(x)[0]
+            reservation = exam.Reservation(trip_id, 0, start, end, car.car_id, x, car.category_id, car.category_name)
+            if action == "add":
+                # added to the original schedule only, as before a reshuffle
+                schedule.add_reservation(reservation)
+                unplaced.append(reservation)
+            else:
+                free   = any(schedule.can_accommodate_reservation(reservation, car, minutes_pause=minutes_pause)
+                             for car in schedule.fleet.get_cars_by_seats(x))
+                car_id = schedule.insert_reservation(reservation, minutes_pause=minutes_pause)
+                repairs += car_id is not None and not free
+        elif action == "cancel":
+            reservation = bookings[rng.integers(len(bookings))]
+            schedule.cancel_reservation(reservation, minutes_pause=minutes_pause)
+            unplaced = [booking for booking in unplaced if booking is not reservation]
+        else:
+            reservation = bookings[rng.integers(len(bookings))]
+            car_id      = schedule.modify_reservation(reservation, start, end, minutes_pause=minutes_pause)
+            assert (reservation.start, reservation.end) == (start, end)
+            if any(booking is reservation for booking in unplaced):
+                assert car_id is None
+
+        assert_consistent(schedule, minutes_pause, unplaced)
+
+    assert repairs > 0
+    assert schedule.leftover_trips
+
+
+# the first car's two bookings are in the way. One of them can move to the second car, but the other can not move anywhere,
+# so the move is undone. Taking the second or third car would need moves that fail as well, so the booking is a leftover
+def test_failed_repair_restores_the_plan():
+    schedule = small_schedule(3)
+    placed(schedule, 1, 1, 2, 1)
+    placed(schedule, 2, 3, 4, 1)
+    placed(schedule, 3, 3, 4, 2)
+    placed(schedule, 4, 0, 5, 3)
+    before = plan(schedule)
+
+    reservation = exam.Reservation(5, 0, hour(1), hour(4), 1, fleet=schedule.fleet)
+    schedule.add_reservation(reservation)
+    assert schedule.place_reservation(reservation, max_moves=2) is None
+
+    after = plan(schedule)
+    assert after[0] == before[0]
+    assert after[2] == before[2]
+    assert {trip_id: car_id for trip_id, car_id in after[1].items() if trip_id != 5} == before[1]
+    assert after[3] == [5]
+    assert_consistent(schedule, 0)
+
+
+# the new booking overlaps a booking on each car. The one on the first car fits on the second car, so it moves there
+# and the new booking takes its place. With max_moves=0 the new booking is a leftover instead
+def test_repair_moves_a_booking():
+    schedule = small_schedule(2)
+    moved    = placed(schedule, 1, 1, 2, 1)
+    placed(schedule, 2, 2.5, 5, 2)
+
+    reservation = exam.Reservation(3, 0, hour(1), hour(3), 1, fleet=schedule.fleet)
+    assert schedule.insert_reservation(reservation, max_moves=0) is None
+    schedule.cancel_reservation(reservation)
+    assert schedule.leftover_trips == []
+
+    assert schedule.insert_reservation(reservation, max_moves=1) == 1
+    assert moved.car_id == 2
+    assert plan(schedule)[0] == {1: {3}, 2: {1, 2}}
+    assert_consistent(schedule, 0)
+
+
+# a booking that was added to the original schedule after the last reshuffle is not in the reshuffled one yet
+def test_cancel_and_modify_a_booking_that_is_not_placed():
+    schedule = small_schedule(2)
+    placed(schedule, 1, 1, 3, 1)
+    first  = exam.Reservation(2, 0, hour(2), hour(4), 2, fleet=schedule.fleet)
+    second = exam.Reservation(3, 0, hour(5), hour(6), 2, fleet=schedule.fleet)
+    schedule.add_reservation(first)
+    schedule.add_reservation(second)
+    before = plan(schedule)
+
+    assert schedule.modify_reservation(first, hour(7), hour(8)) is None
+    assert (first.start, first.end) == (exam.to_epoch_seconds(hour(7)), exam.to_epoch_seconds(hour(8)))
+    schedule.cancel_reservation(second)
+    assert [booking.trip_id for booking in schedule.trips[2]] == [2]
+    assert plan(schedule)[0] == before[0]
+    assert_consistent(schedule, 0, unplaced=[first])
+
+    # a booking that is not in the schedule at all changes nothing
+    stranger = exam.Reservation(4, 0, hour(1), hour(2), 1, fleet=schedule.fleet)
+    with pytest.raises(ValueError):
+        schedule.cancel_reservation(stranger)
+    with pytest.raises(ValueError):
+        schedule.modify_reservation(stranger, hour(3), hour(4))
+    assert (stranger.start, [booking.trip_id for booking in schedule.trips[2]]) == (exam.to_epoch_seconds(hour(1)), [2])
+
+    # the next reshuffle places the booking with its new times
+    schedule.reshuffle()
+    assert schedule.placement_of(first) == "reshuffled_trips"
@@ -0,0 +1,126 @@
+# The reshuffle engines: every booking is placed once or left over, no car has overlapping bookings, worker processes
+# give the plan of the serial run, and the rolling horizon
+
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+import exam
+from exam import max_overlapping
+
+
+# {trip_id: car_id} of the reshuffled schedule and the sorted trip ids of the leftover bookings
+def plan(schedule):
+    placed = {booking.trip_id: car_id for car_id, bookings in schedule.reshuffled_trips.items() for booking in bookings}
+    return placed, sorted(booking.trip_id for booking in schedule.leftover_trips)
+
+
+# the (start, end) of the bookings of each car, which does not depend on the order of bookings with the same times
+def shape(schedule):
+    return {car_id: sorted((booking.start, booking.end) for booking in bookings) for car_id, bookings in schedule.reshuffled_trips.items()}
+
+
+# every booking is placed once or left over, on a car with its number of seats, and no car has two bookings closer than the pause
+def assert_valid(schedule, minutes_pause):
+    placed = [booking for bookings in schedule.reshuffled_trips.values() for booking in bookings]
+    assert len(placed) + len(schedule.leftover_trips) == sum(len(bookings) for bookings in schedule.trips.values())
+
+    for car_id, bookings in schedule.reshuffled_trips.items():
+        assert all(booking.seats == schedule.fleet.cars[car_id].seats for booking in bookings)
+        bookings = sorted(bookings, key=lambda booking: (booking.start, booking.end))
+        assert all(later.start >= earlier.end + minutes_pause * 60 for earlier, later in zip(bookings, bookings[1:]))
+
+
+@pytest.mark.parametrize("engine", ["first_fit", "sweep", "optimal"])
+def test_reshuffle_is_valid(make_schedule, engine):
+    schedule = make_schedule()
+    schedule.reshuffle(minutes_pause=30, engine=engine)
+    assert_valid(schedule, 30)
+    assert not schedule.leftover_trips
+
+
+# the sweep uses as many cars of each number of seats as the largest number of overlapping bookings, which is the lower bound
+@pytest.mark.parametrize("minutes_pause", [0, 30])
+def test_sweep_uses_the_fewest_cars(make_schedule, minutes_pause):
+    schedule = make_schedule()
+    schedule.reshuffle(minutes_pause=minutes_pause, engine="sweep")
+
+    groups = {} # {seats: [reservation]}
+    for bookings in schedule.trips.values():
+        for booking in bookings:
+            groups.setdefault(booking.seats, []).append(booking)
+    for seats, bookings in groups.items():
+        starts = np.array([booking.start for booking in bookings])
+        ends   = np.array([booking.end for booking in bookings])
+        cars   = [car_id for car_id in schedule.reshuffled_trips if schedule.fleet.cars[car_id].seats == seats]
+        assert len(cars) == max_overlapping(starts, ends, minutes_pause * 60)
+
+
+@pytest.mark.parametrize("engine", ["first_fit", "sweep", "optimal"])
+def test_workers_give_the_serial_plan(make_schedule, engine):
+    # capped groups leave bookings over, so the optimal engine runs the solver
+    fleet_caps = {seats: 2 for seats in range(10)} if engine == "optimal" else None
+    schedule   = make_schedule()
+
+    schedule.reshuffle(minutes_pause=30, engine=engine, fleet_caps=fleet_caps)
+    serial = plan(schedule)
+    schedule.reshuffle(minutes_pause=30, engine=engine, fleet_caps=fleet_caps, workers=2)
+    assert plan(schedule) == serial
+    assert_valid(schedule, 30)
+    if engine == "optimal":
+        assert schedule.leftover_trips
+
+
+def test_optimal_serves_at_least_the_sweep(make_schedule):
+    fleet_caps = {seats: 2 for seats in range(10)}
+    schedule   = make_schedule()
+
+    schedule.reshuffle(minutes_pause=30, engine="sweep", fleet_caps=fleet_caps)
+    sweep_leftovers = len(schedule.leftover_trips)
+    schedule.reshuffle(minutes_pause=30, engine="optimal", fleet_caps=fleet_caps)
+    assert len(schedule.leftover_trips) <= sweep_leftovers
+    assert all(row["Optimality gap"] is None or row["Optimality gap"] >= 0 for row in schedule.optimality)
+
+
+@pytest.mark.parametrize("window_hours, overlap_hours", [(24, 0), (6, 0), (24, 3), (1, 0)])
+@pytest.mark.parametrize("minutes_pause", [0, 30])
+def test_rolling_sweep_matches_full_sweep(make_schedule, window_hours, overlap_hours, minutes_pause):
+    schedule = make_schedule()
+    schedule.reshuffle(minutes_pause=minutes_pause, engine="sweep")
+    full = shape(schedule)
+
+    schedule.reshuffle_rolling(window_hours=window_hours, overlap_hours=overlap_hours, minutes_pause=minutes_pause, engine="sweep")
+    assert shape(schedule) == full
+    assert_valid(schedule, minutes_pause)
+
+
+@pytest.mark.parametrize("window_hours, overlap_hours", [(24, 0), (24, 4), (6, 2)])
+def test_rolling_first_fit_is_valid_and_parallel(make_schedule, window_hours, overlap_hours):
+    schedule = make_schedule()
+    schedule.reshuffle_rolling(window_hours=window_hours, overlap_hours=overlap_hours, minutes_pause=30)
+    assert_valid(schedule, 30)
+    serial = plan(schedule)
+
+    schedule.reshuffle_rolling(window_hours=window_hours, overlap_hours=overlap_hours, minutes_pause=30, workers=3)
+    assert plan(schedule) == serial
+
+
+# a car that is only busy with a booking carried over from before the period is not free, and has no interval index to repair
+def test_carried_over_car_is_busy():
+    fleet = exam.Fleet()
+    for car_id in (1, 2):
+        car = exam.Car(car_id, 1, 1, car_id, "")
+        car.set_model("model", 5, 1, "category")
+        fleet.add_car(car_id, car)
+
+    hour     = lambda h: datetime(2023, 1, 1, h, tzinfo=timezone.utc)
+    schedule = exam.Schedule(hour(0), hour(23), fleet=fleet)
+    schedule.add_reservation(exam.Reservation(1, 0, hour(1), hour(3), 1, fleet=fleet))
+    schedule.reshuffle(carry={2: exam.to_epoch_seconds(hour(5))})
+    assert schedule.reshuffled_trips[1][0].trip_id == 1
+
+    booking = exam.Reservation(2, 0, hour(2), hour(4), 1, fleet=fleet)
+    assert not schedule.can_accommodate_reservation(booking, fleet.cars[2])
+    assert schedule.place_reservation(booking) is None
+    assert schedule.can_accommodate_reservation(exam.Reservation(3, 0, hour(5), hour(6), 1, fleet=fleet), fleet.cars[2])
@@ -0,0 +1,99 @@
+# The availability service: lookups against the overlap check, bad requests that only fail themselves, and concurrent
+# bookings through the single writer task
+
+import asyncio
+
+import pandas as pd
+import pytest
+
+import exam
+from service import AvailabilityService
+
+
+# a reshuffled schedule of the synthetic trips and a service over it
+@pytest.fixture
+def service(make_schedule):
+    schedule = make_schedule()
+    schedule.reshuffle(minutes_pause=30, engine="sweep")
+    return AvailabilityService(schedule, minutes_pause=30)
+
+
+def lookup(start, hours, seats=5, **options):
+    return {"op": "available", "seats": seats, "start": start, "end": str(pd.Timestamp(start) + pd.Timedelta(hours=hours)), **options}
+
+
+def book(trip_id, start, hours, seats=5, **options):
+    return {"op": "book", "trip_id": trip_id, "seats": seats, "start": start, "end": str(pd.Timestamp(start) + pd.Timedelta(hours=hours)), **options}
+
+
+# no car of the reshuffled schedule has two bookings closer than the pause
+def assert_no_overlaps(schedule, minutes_pause):
+    for bookings in schedule.reshuffled_trips.values():
+        bookings = sorted(bookings, key=lambda booking: (booking.start, booking.end))
+        assert all(later.start >= earlier.end + minutes_pause * 60 for earlier, later in zip(bookings, bookings[1:]))
+
+
+@pytest.mark.parametrize("start", ["2023-01-02T10:00Z", "2023-01-05T23:30Z", "2023-01-12T06:15Z"])
+def test_lookups_match_the_overlap_check(service, start):
+    schedule = service.schedule
+    request  = lookup(start, 3)
+    window   = exam.Reservation(0, 0, pd.Timestamp(request["start"]), pd.Timestamp(request["end"]), None, 5, None, None)
+    expected = [car.car_id for car in schedule.fleet.get_cars_by_seats(5, sort_by="category_id")
+                if schedule.can_accommodate_reservation(window, car, minutes_pause=30)]
+
+    responses = service.evaluate([(request, None), (lookup(start, 3, limit=2), None), (lookup(start, 3, limit="1"), None)])
+    assert responses == [{"ok": True, "cars": expected}, {"ok": True, "cars": expected[:2]}, {"ok": True, "cars": expected[:1]}]
+
+
+@pytest.mark.parametrize("bad", [
+    lookup("2023-01-02T10:00Z", 3, limit="three"),
+    lookup("2023-01-02T10:00Z", 3, limit=-1),
+    lookup("2023-01-02T10:00Z", 3, limit=[1]),
+    {"op": "available", "seats": 5, "start": "not a time", "end": "2023-01-02T10:00Z"},
+    {"op": "available", "seats": 5},
+    {"op": "cancel"},
+    [1, 2],
+    book("x", "2023-01-02T10:00Z", 1),
+    book(99000001, "2023-01-02T10:00Z", -1),
+    book(99000001, "2023-01-02T10:00Z", 1, car_id=-5),
+    book(99000001, "2023-01-02T10:00Z", 1, seats=99),
+])
+def test_bad_request_only_fails_itself(service, bad):
+    good     = lookup("2023-01-02T10:00Z", 3)
+    trips    = {car_id: list(bookings) for car_id, bookings in service.schedule.trips.items()}
+    expected = service.evaluate([(good, None)])[0]
+
+    responses = service.evaluate([(good, None), (bad, None), (good, None)])
+    assert responses[0] == responses[2] == expected
+    assert not responses[1]["ok"]
+    assert service.schedule.trips == trips
+
+
+def test_lookup_after_booking_sees_it(service):
+    start = "2023-01-03T12:00Z"
+    before, booked, after = service.evaluate([(lookup(start, 2), None), (book(99000001, start, 2), None), (lookup(start, 2), None)])
+
+    # the booking goes to the cheapest free car, which is then no longer free
+    assert booked == {"ok": True, "car_id": before["cars"][0]}
+    assert after["cars"] == before["cars"][1:]
+
+
+# many clients book the same window at once. The single writer evaluates them in batches, and no car gets two overlapping bookings
+def test_concurrent_bookings(service):
+    async def scenario():
+        service.queue = asyncio.Queue()
+        writer_task   = asyncio.create_task(service.run())
+        requests      = [book(99000000 + i, "2023-01-04T08:00Z", 3) for i in range(40)] + [[1]] * 5
+        responses     = await asyncio.gather(*(service.submit(request) for request in requests))
+        writer_task.cancel()
+        return responses
+
+    responses = asyncio.run(scenario())
+    assert all(response["ok"] for response in responses[:40])
+    assert not any(response["ok"] for response in responses[40:])
+    assert len(service.batch_sizes) < len(responses)
+
+    placed = [response["car_id"] for response in responses[:40] if response["car_id"] is not None]
+    assert len(placed) == len(set(placed))
+    assert_no_overlaps(service.schedule, 30)
+    assert sum(len(bookings) for bookings in service.schedule.trips.values()) == 1540
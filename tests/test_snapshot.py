@@ -0,0 +1,84 @@
+# Saving and loading schedules: the reports of a loaded snapshot, the lazily created reservations, and the cached tables
+# after online changes
+
+import pandas as pd
+import pytest
+
+import exam
+
+
+# a reshuffled schedule with capped groups, so it has leftover bookings, and the same schedule saved and loaded again
+@pytest.fixture
+def saved(make_schedule, tmp_path):
+    schedule = make_schedule()
+    schedule.reshuffle(minutes_pause=30, engine="sweep", fleet_caps={seats: 3 for seats in range(10)})
+    assert schedule.leftover_trips
+
+    schedule.save(tmp_path / "snapshot")
+    return schedule, exam.Schedule.load(tmp_path / "snapshot", fleet=schedule.fleet)
+
+
+def find(schedule, trip_id):
+    return next(booking for bookings in schedule.trips.values() for booking in bookings if booking.trip_id == trip_id)
+
+
+# {trip_id: car_id} of the reshuffled schedule and the trip ids of the leftover bookings
+def plan(schedule):
+    return ({booking.trip_id: car_id for car_id, bookings in schedule.reshuffled_trips.items() for booking in bookings},
+            sorted(booking.trip_id for booking in schedule.leftover_trips))
+
+
+def assert_same_reports(schedule, loaded):
+    for specified_schedule in ("trips", "reshuffled_trips"):
+        pd.testing.assert_frame_equal(loaded.report(specified_schedule), schedule.report(specified_schedule))
+
+
+def test_loaded_snapshot_reports_without_creating_reservations(saved):
+    schedule, loaded = saved
+
+    assert_same_reports(schedule, loaded)
+    assert loaded.count_leftover_trips() == len(schedule.leftover_trips)
+    assert loaded.snapshot is not None
+
+    # the first use of the bookings creates them, with the same plan
+    assert plan(loaded) == plan(schedule)
+    assert loaded.snapshot is None
+    assert loaded.count_leftover_trips() == len(schedule.leftover_trips)
+    assert_same_reports(schedule, loaded)
+
+
+def test_materialize_shares_the_bookings_of_both_plans(saved):
+    schedule, loaded = saved
+
+    original   = {id(booking) for bookings in loaded.trips.values() for booking in bookings}
+    reshuffled = [booking for bookings in loaded.reshuffled_trips.values() for booking in bookings]
+    assert len(original) == sum(len(bookings) for bookings in schedule.trips.values())
+    assert {id(booking) for booking in reshuffled} | {id(booking) for booking in loaded.leftover_trips} == original
+    assert len(reshuffled) + len(loaded.leftover_trips) == len(original)
+
+    # so a change to a booking shows in both plans
+    booking = reshuffled[0]
+    loaded.modify_reservation(booking, booking.start_ts, booking.ends_ts + pd.Timedelta(minutes=1))
+    assert find(loaded, booking.trip_id).end == booking.end
+
+
+# the same online changes on the schedule in memory and on the loaded one give the same reports
+@pytest.mark.parametrize("change", ["modify", "insert", "cancel"])
+def test_reports_after_online_changes_on_a_loaded_schedule(saved, change):
+    schedule, loaded = saved
+    report_before = loaded.report("reshuffled_trips")
+
+    placed_trip = next(booking.trip_id for bookings in schedule.reshuffled_trips.values() for booking in bookings)
+    for target in (schedule, loaded):
+        booking = find(target, placed_trip)
+        if change == "modify":
+            target.modify_reservation(booking, booking.start_ts + pd.Timedelta(hours=1), booking.ends_ts + pd.Timedelta(hours=5), minutes_pause=30)
+        elif change == "insert":
+            new = exam.Reservation(99_000_000, 0, booking.start_ts, booking.ends_ts, booking.car_id, booking.seats, booking.category_id, booking.category_name)
+            target.insert_reservation(new, minutes_pause=30)
+        else:
+            target.cancel_reservation(booking, minutes_pause=30)
+
+    assert not loaded.report("reshuffled_trips").equals(report_before)
+    assert_same_reports(schedule, loaded)
+    assert plan(loaded) == plan(schedule)
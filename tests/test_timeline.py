@@ -0,0 +1,88 @@
+# The Fenwick and segment trees and the occupancy timeline against brute-force arrays
+
+import numpy as np
+import pytest
+
+from exam import FenwickTree, MaxSegmentTree, OccupancyTimeline, Reservation
+
+
+@pytest.mark.parametrize("n", [1, 2, 7, 64, 100])
+def test_fenwick_tree_matches_array(n):
+    rng    = np.random.default_rng(n)
+    tree   = FenwickTree(n)
+    values = np.zeros(n, dtype=np.int64)
+
+    for _ in range(500):
+        first = int(rng.integers(0, n))
+        last  = int(rng.integers(first, n)) + 1
+        value = int(rng.integers(-5, 10))
+        tree.add(first, last, value)
+        values[first:last] += value
+
+        first = int(rng.integers(0, n))
+        last  = int(rng.integers(first, n)) + 1
+        assert tree.sum(first, last) == values[first:last].sum()
+
+
+@pytest.mark.parametrize("n", [1, 2, 7, 64, 100])
+def test_max_segment_tree_matches_array(n):
+    rng    = np.random.default_rng(n)
+    tree   = MaxSegmentTree(n)
+    values = np.zeros(n, dtype=np.int64)
+
+    for _ in range(500):
+        first = int(rng.integers(0, n))
+        last  = int(rng.integers(first, n)) + 1
+        value = int(rng.integers(-3, 5))
+        tree.add(first, last, value)
+        values[first:last] += value
+
+        first = int(rng.integers(0, n))
+        last  = int(rng.integers(first, n)) + 1
+        assert tree.max(first, last) == values[first:last].max()
+
+
+# busy cars and booked seconds per bucket, from the overlap of every booking with every bucket
+def brute_force_buckets(reservations, origin, size, bucket, pause):
+    busy_cars    = np.zeros(size, dtype=np.int64)
+    busy_seconds = np.zeros(size, dtype=np.int64)
+    for reservation in reservations:
+        for b in range(size):
+            overlap = min(reservation.end + pause, origin + (b + 1) * bucket) - max(reservation.start, origin + b * bucket)
+            if overlap > 0:
+                busy_cars[b]    += 1
+                busy_seconds[b] += overlap
+    return busy_cars, busy_seconds
+
+
+@pytest.mark.parametrize("minutes_pause", [0, 30])
+def test_occupancy_timeline_matches_brute_force(minutes_pause):
+    rng    = np.random.default_rng(minutes_pause)
+    period = (1_672_531_200, 1_672_531_200 + 2 * 24 * 3600)
+    cars   = {5: 40}
+
+    # bookings that stick out of the period on both sides are cut at its edges
+    reservations = []
+    for trip_id in range(400):
+        start = period[0] + int(rng.integers(-6 * 3600, 2 * 24 * 3600))
+        reservations.append(Reservation(trip_id, 0, start, start + int(rng.integers(0, 5 * 3600)), 1, seats=5, category_id=1, category_name="c"))
+
+    timeline = OccupancyTimeline(period[0], period[1], cars, bucket_minutes=15, minutes_pause=minutes_pause)
+    for reservation in reservations:
+        timeline.add(reservation)
+    for reservation in reservations[::3]:
+        timeline.remove(reservation)
+    kept = [reservation for i, reservation in enumerate(reservations) if i % 3]
+
+    busy_cars, busy_seconds = brute_force_buckets(kept, timeline.origin, timeline.size, timeline.bucket, timeline.pause)
+    for _ in range(300):
+        start = period[0] + int(rng.integers(0, 2 * 24 * 3600))
+        end   = start + int(rng.integers(1, 8 * 3600))
+        start_ts, ends_ts = (np.datetime64(t, "s").astype(object) for t in (start, end))
+
+        # the buckets the window touches, inside the period
+        touched = [b for b in range(timeline.size)
+                   if start < timeline.origin + (b + 1) * timeline.bucket and end > timeline.origin + b * timeline.bucket]
+        assert timeline.peak(5, start_ts, ends_ts) == busy_cars[touched].max()
+        assert timeline.available(5, start_ts, ends_ts) == cars[5] - busy_cars[touched].max()
+        assert timeline.utilization(5, start_ts, ends_ts) == pytest.approx(busy_seconds[touched].sum() / (cars[5] * len(touched) * timeline.bucket))